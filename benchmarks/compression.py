@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Compression benchmark: bytes on the wire and CPU time per record for every
+# codec (compressing batches of -b records, as the producer does) and for the
+# value-level zstd dictionary mode.
+#
+#   python compression.py [-n RECORDS] [-b BATCH_SIZE] [-f RECORDS_FILE]
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_PATH)
+
+from pickle5 import pickle
+from catenae.compression import DictionaryCompressor
+
+
+def get_codecs():
+    codecs = {'none': (lambda data: data, lambda data: data)}
+    try:
+        import snappy
+        codecs['snappy'] = (snappy.compress, snappy.decompress)
+    except ImportError:
+        pass
+    try:
+        import lz4.frame
+        codecs['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=DictionaryCompressor.LEVEL)
+        decompressor = zstandard.ZstdDecompressor()
+        codecs['zstd'] = (compressor.compress, decompressor.decompress)
+    except ImportError:
+        pass
+    return codecs
+
+
+def get_synthetic_records(number):
+    records = []
+    for i in range(number):
+        value = {
+            'user': f'user_{random.randint(0, 10000)}',
+            'event': random.choice(['click', 'view', 'scroll', 'share']),
+            'url': f'https://example.com/articles/{random.randint(0, 500)}',
+            'timestamp': 1560000000000 + i
+        }
+        if i % 2:
+            records.append(json.dumps(value).encode('utf-8'))
+        else:
+            records.append(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return records
+
+
+def get_batches(records, batch_size):
+    return [b''.join(records[i:i + batch_size]) for i in range(0, len(records), batch_size)]
+
+
+def benchmark_codec(compress, decompress, batches):
+    start = time.process_time()
+    compressed = [compress(batch) for batch in batches]
+    compression_time = time.process_time() - start
+
+    start = time.process_time()
+    for batch in compressed:
+        decompress(batch)
+    decompression_time = time.process_time() - start
+
+    return sum(len(batch) for batch in compressed), compression_time, decompression_time
+
+
+def benchmark_dictionary(records, batch_size):
+    compressor = DictionaryCompressor()
+    # Half of the records are used to train the dictionary
+    training_records = records[:len(records) // 2]
+    for record in training_records:
+        compressor.compress('benchmark', record)
+    start = time.process_time()
+    dictionary_id, _ = compressor.train('benchmark')
+    training_time = time.process_time() - start
+    compressor.activate('benchmark', dictionary_id)
+
+    start = time.process_time()
+    compressed = [compressor.compress('benchmark', record)[1] for record in records]
+    compression_time = time.process_time() - start
+
+    start = time.process_time()
+    for record in compressed:
+        compressor.decompress(dictionary_id, record)
+    decompression_time = time.process_time() - start
+
+    # The dictionary id header is included
+    size = sum(len(record) + len(str(dictionary_id)) for record in compressed)
+    return size, compression_time, decompression_time, training_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--records', type=int, default=100000, help='Synthetic records.')
+    parser.add_argument('-b',
+                        '--batch-size',
+                        type=int,
+                        default=1,
+                        help='Records per producer batch (batch.num.messages).')
+    parser.add_argument('-f', '--file', help='File with a sample record per line.')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as records_file:
+            records = [line.rstrip(b'\n') for line in records_file if line.strip()]
+    else:
+        records = get_synthetic_records(args.records)
+    raw_size = sum(len(record) for record in records)
+    batches = get_batches(records, args.batch_size)
+
+    print(f'{len(records)} records, {raw_size / len(records):.1f} bytes/record, '
+          f'batches of {args.batch_size}')
+    print(f'{"codec":<12}{"bytes/record":>14}{"ratio":>8}{"compress (us)":>16}'
+          f'{"decompress (us)":>18}')
+
+    results = []
+    for name, (compress, decompress) in get_codecs().items():
+        results.append((name, ) + benchmark_codec(compress, decompress, batches))
+
+    try:
+        size, compression_time, decompression_time, training_time = \
+            benchmark_dictionary(records, args.batch_size)
+        results.append(('zstd-dict', size, compression_time, decompression_time))
+    except ImportError:
+        training_time = None
+
+    for name, size, compression_time, decompression_time in results:
+        print(f'{name:<12}{size / len(records):>14.1f}{raw_size / size:>8.2f}'
+              f'{compression_time / len(records) * 1e6:>16.2f}'
+              f'{decompression_time / len(records) * 1e6:>18.2f}')
+
+    if training_time is not None:
+        print(f'dictionary training: {training_time * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
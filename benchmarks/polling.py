@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Polling benchmark: latency and CPU time of a pipeline of links connected by
+# shared-memory channels (a Topology), fixed vs. adaptive poll timeouts. CPU
+# times are read from /proc, so it runs on Linux only.
+#
+#   python polling.py [--stages 3] [--rate-per-second 20] [--duration 5] [--messages 20000]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from threading import Thread
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_PATH)
+
+from catenae import Link, Topology
+
+WARMUP_TIME = 2
+POLL_TIMEOUT = 30
+
+
+class Forward(Link):
+    def transform(self, electron):
+        return electron.value
+
+
+def get_cpu_time(pids):
+    """ User + system seconds of the given processes. """
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for pid in pids:
+        with open(f'/proc/{pid}/stat') as stat_file:
+            # The name of the process, in parentheses, may contain spaces
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        total += int(fields[11]) + int(fields[12])
+    return total / ticks
+
+
+def get_topology(stages, adaptive_polling):
+    topology = Topology()
+    for stage in range(stages):
+        topology.add(Forward,
+                     input_topics=[f'stage{stage}'],
+                     output_topics=[f'stage{stage + 1}'],
+                     name=f'forward{stage}',
+                     log_level='warning',
+                     adaptive_polling=adaptive_polling)
+    topology.subscribe(f'stage{stages}')
+    return topology
+
+
+def measure_idle(topology, duration):
+    pids = [process.pid for process in topology.processes]
+    cpu_start = get_cpu_time(pids)
+    time.sleep(duration)
+    return (get_cpu_time(pids) - cpu_start) / duration
+
+
+def measure_sparse(topology, rate, duration):
+    """ Latencies of messages sent every 1 / rate seconds and the CPU time. """
+    pids = [process.pid for process in topology.processes]
+    cpu_start = get_cpu_time(pids)
+    latencies = []
+    for _ in range(int(rate * duration)):
+        topology.send(time.monotonic(), topic='stage0')
+        electron = topology.poll(timeout=POLL_TIMEOUT)
+        latencies.append(time.monotonic() - electron.value)
+        time.sleep(max(1 / rate - latencies[-1], 0))
+    return latencies, (get_cpu_time(pids) - cpu_start) / duration
+
+
+def measure_dense(topology, messages):
+    """ Throughput of messages sent as fast as possible and the CPU time per message. """
+    pids = [process.pid for process in topology.processes]
+    cpu_start = get_cpu_time(pids)
+    start_time = time.monotonic()
+    sender = Thread(target=lambda: [topology.send(i, topic='stage0') for i in range(messages)])
+    sender.start()
+    for _ in range(messages):
+        topology.poll(timeout=POLL_TIMEOUT)
+    sender.join()
+    elapsed = time.monotonic() - start_time
+    return messages / elapsed, (get_cpu_time(pids) - cpu_start) / messages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stages', type=int, default=3)
+    parser.add_argument('--rate-per-second', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+    # The links parse the arguments of the process too
+    sys.argv = sys.argv[:1]
+
+    print(f'{args.stages} stages, {args.rate_per_second} msg/s sparse, '
+          f'{args.messages} messages dense')
+    print(f'{"mode":>10}{"idle CPU":>10}{"p50 (ms)":>10}{"p99 (ms)":>10}{"sparse CPU":>12}'
+          f'{"dense msg/s":>13}{"CPU/msg (us)":>14}')
+    for mode, adaptive_polling in [('fixed', False), ('adaptive', True)]:
+        with get_topology(args.stages, adaptive_polling) as topology:
+            time.sleep(WARMUP_TIME)
+            idle_cpu = measure_idle(topology, args.duration)
+            latencies, sparse_cpu = measure_sparse(topology, args.rate_per_second,
+                                                   args.duration)
+            throughput, message_cpu = measure_dense(topology, args.messages)
+
+        latencies = sorted(latencies)
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        print(f'{mode:>10}{idle_cpu:>10.2%}{statistics.median(latencies) * 1e3:>10.2f}'
+              f'{p99 * 1e3:>10.2f}{sparse_cpu:>12.2%}{throughput:>13.0f}'
+              f'{message_cpu * 1e6:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
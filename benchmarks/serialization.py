@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Serialization benchmark: time to serialize / deserialize electrons with NumPy
+# array values, in-band pickle vs. out-of-band buffers.
+#
+#   python serialization.py [-n RUNS] [-s 1000,100000,1000000]
+
+import argparse
+import os
+import sys
+import time
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_PATH)
+
+import numpy
+from pickle5 import pickle
+from catenae import Electron, serialization
+
+
+def in_band_dumps(obj):
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def measure(function, argument, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = function(argument)
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=200)
+    parser.add_argument('-s',
+                        '--sizes',
+                        default='1000,100000,1000000',
+                        help='Array sizes in bytes, comma-separated.')
+    args = parser.parse_args()
+
+    print(f'{"size (B)":>10}{"mode":>14}{"dumps (us)":>14}{"loads (us)":>14}')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        electron = Electron(value={'features': numpy.random.rand(size // 8), 'id': 1})
+        sendable = electron.get_sendable()
+        for mode, dumps, loads in [('in-band', in_band_dumps, pickle.loads),
+                                   ('out-of-band', serialization.dumps, serialization.loads)]:
+            dumps_time, data = measure(dumps, sendable, args.runs)
+            loads_time, _ = measure(loads, data, args.runs)
+            print(f'{size:>10}{mode:>14}{dumps_time * 1e6:>14.1f}{loads_time * 1e6:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
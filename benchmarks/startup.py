@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Startup benchmark: import time / RSS of catenae and of the optional drivers,
+# and time-to-first-message of a link if a Kafka endpoint is given.
+#
+#   python startup.py [-n RUNS] [-k localhost:9092]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from uuid import uuid4
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+IMPORT_SNIPPET = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+OPTIONAL_MODULES = [
+    'confluent_kafka', 'eventlet', 'easyaerospike', 'easymongo', 'easyrocks', 'catenae.json_rpc'
+]
+
+FIRST_MESSAGE_LINK = """
+import os, sys, time
+sys.argv = sys.argv[:1] + {args}
+from catenae import Link
+
+class FirstMessageLink(Link):
+    def transform(self, electron):
+        elapsed = time.time() - float(os.environ['CATENAE_BENCHMARK_START'])
+        print(elapsed, flush=True)
+        os._exit(0)
+
+FirstMessageLink(log_level='error').start()
+"""
+
+
+def run_python(code, env=None):
+    process_env = dict(os.environ)
+    process_env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [ROOT_PATH, process_env.get('PYTHONPATH')]))
+    if env:
+        process_env.update(env)
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL,
+                            env=process_env,
+                            timeout=300).stdout.decode('utf-8').strip()
+    return output.split() if output else None
+
+
+def benchmark_import(module, runs):
+    times = []
+    rss = []
+    for _ in range(runs):
+        output = run_python(IMPORT_SNIPPET.format(module=module))
+        if output is None:
+            return None
+        times.append(float(output[0]))
+        rss.append(int(output[1]))
+    return statistics.median(times), statistics.median(rss)
+
+
+def benchmark_first_message(kafka_endpoint, runs):
+    from confluent_kafka import Producer
+
+    times = []
+    for _ in range(runs):
+        topic = f'catenae_benchmark_{uuid4().hex[:12]}'
+        producer = Producer({'bootstrap.servers': kafka_endpoint})
+        producer.produce(topic=topic, value=b'benchmark')
+        producer.flush()
+
+        args = ['-i', topic, '-k', kafka_endpoint, '-g', topic]
+        env = {'CATENAE_BENCHMARK_START': str(time.time())}
+        output = run_python(FIRST_MESSAGE_LINK.format(args=args), env=env)
+        if output is None:
+            return None
+        times.append(float(output[-1]))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=5, help='Runs per measurement.')
+    parser.add_argument('-k',
+                        '--kafka-bootstrap-server',
+                        dest='kafka_endpoint',
+                        help='Measure time-to-first-message against this Kafka endpoint.')
+    args = parser.parse_args()
+
+    print(f'{"module":<24}{"import (ms)":>14}{"max RSS (MiB)":>16}')
+    for module in ['catenae'] + OPTIONAL_MODULES:
+        result = benchmark_import(module, args.runs)
+        if result is None:
+            print(f'{module:<24}{"unavailable":>14}')
+            continue
+        elapsed, rss = result
+        print(f'{module:<24}{elapsed * 1000:>14.1f}{rss / 1024:>16.1f}')
+
+    if args.kafka_endpoint:
+        elapsed = benchmark_first_message(args.kafka_endpoint, args.runs)
+        if elapsed is None:
+            print('time-to-first-message: failed')
+        else:
+            print(f'time-to-first-message: {elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,16 @@
 
 from .electron import Electron
 from .link import Link, rpc
+from .chain import Chain
+from .topology import Topology
 from . import utils
 from . import errors
+from . import serialization
+from . import windows
 from .logger import Logger
 from .structures import CircularOrderedDict, CircularOrderedSet
+from .state import StateStore
+from .claim_check import BlobStore, FileBlobStore, RocksDBBlobStore
 from .custom_queue import ThreadingQueue
 from .custom_threading import Thread, ThreadPool, should_stop
 
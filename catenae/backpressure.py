@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+
+class InFlightLimiter:
+    """
+    Count and size of the consumed messages which have not been fully processed
+    yet. It is throttled when any of the limits is reached and stays throttled
+    until both are below RESUME_RATIO of their limits.
+    """
+
+    RESUME_RATIO = 0.5
+
+    def __init__(self, max_messages=None, max_bytes=None):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._messages = 0
+        self._bytes = 0
+        self._throttled = False
+        self._throttles = 0
+        self._lock = Lock()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': self._messages,
+                'bytes': self._bytes,
+                'throttled': self._throttled,
+                'throttles': self._throttles
+            }
+
+    def acquire(self, size):
+        with self._lock:
+            self._messages += 1
+            self._bytes += size
+
+    def release(self, size):
+        with self._lock:
+            self._messages -= 1
+            self._bytes -= size
+
+    def _is_over(self, ratio):
+        if self.max_messages is not None and self._messages >= self.max_messages * ratio:
+            return True
+        if self.max_bytes is not None and self._bytes >= self.max_bytes * ratio:
+            return True
+        return False
+
+    @property
+    def throttled(self):
+        with self._lock:
+            if self._throttled:
+                self._throttled = self._is_over(InFlightLimiter.RESUME_RATIO)
+            elif self._is_over(1):
+                self._throttled = True
+                self._throttles += 1
+            return self._throttled
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import Future
+from threading import Lock, Event
+
+
+class BatchedAerospikeConnector:
+    """
+    Wrapper for an AerospikeConnector with batch reads. If coalesce_window is set,
+    get() calls issued by concurrent threads within the window are merged into
+    a single batch read and every caller receives its own result. Any other
+    method is delegated to the wrapped connector.
+    """
+    def __init__(self, connector, coalesce_window=None, max_batch_size=5000):
+        self._connector = connector
+        self.coalesce_window = coalesce_window
+        self.max_batch_size = max_batch_size
+
+        self._pending = []
+        self._collecting = False
+        self._batch_full = Event()
+        self._lock = Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._connector, name)
+
+    def _get_as_key(self, key, namespace, set_name):
+        if namespace is None:
+            namespace = getattr(self._connector, '_default_namespace', None)
+        if set_name is None:
+            set_name = getattr(self._connector, '_default_set', None)
+        return (namespace, set_name, key)
+
+    @staticmethod
+    def _unpack_bins(key, bins):
+        """ Same output as AerospikeConnector.get() """
+        if bins is None:
+            return None, None
+
+        # Return a single value if there is only one bin
+        if len(bins) == 1:
+            if 'value' in bins:
+                return None, bins['value']
+            elif 'key' in bins:
+                return bins['key'], None
+
+        # Return a tuple if the record is of type key -> (key, value)
+        elif len(bins) == 2:
+            if 'key' in bins and 'value' in bins:
+                return bins['key'], bins['value']
+            elif 'key' in bins and key in bins:
+                return bins['key'], bins[key]
+        return None, bins
+
+    def _get_many(self, as_keys):
+        self._connector.open_connection()
+        # Repeated keys are only requested once
+        unique_as_keys = list(dict.fromkeys(as_keys))
+        records = self._connector.client.get_many(unique_as_keys)
+        bins_by_key = {as_key: record[2] for as_key, record in zip(unique_as_keys, records)}
+        return [
+            BatchedAerospikeConnector._unpack_bins(as_key[2], bins_by_key[as_key])
+            for as_key in as_keys
+        ]
+
+    def get_many(self, keys, namespace=None, set_name=None):
+        """ Returns a list of (key, value) tuples in the same order of keys. """
+        as_keys = [self._get_as_key(key, namespace, set_name) for key in keys]
+        return self._get_many_in_batches(as_keys)
+
+    def _get_many_in_batches(self, as_keys):
+        results = []
+        for i in range(0, len(as_keys), self.max_batch_size):
+            results += self._get_many(as_keys[i:i + self.max_batch_size])
+        return results
+
+    def get(self, key, namespace=None, set_name=None):
+        if not self.coalesce_window:
+            return self._connector.get(key, namespace, set_name)
+
+        future = Future()
+        with self._lock:
+            self._pending.append((self._get_as_key(key, namespace, set_name), future))
+            leader = not self._collecting
+            self._collecting = True
+            if len(self._pending) >= self.max_batch_size:
+                self._batch_full.set()
+
+        # The first caller of the window executes the batch for all the others
+        if leader:
+            self._batch_full.wait(self.coalesce_window)
+            with self._lock:
+                pending = self._pending
+                self._pending = []
+                self._collecting = False
+                self._batch_full.clear()
+
+            try:
+                results = self._get_many_in_batches([as_key for as_key, _ in pending])
+                for (_, pending_future), result in zip(pending, results):
+                    pending_future.set_result(result)
+            except Exception as exception:
+                for _, pending_future in pending:
+                    pending_future.set_exception(exception)
+
+        return future.result()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from threading import Lock
+from bson import BSON
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+class BufferedMongodbConnector:
+    """
+    Write-behind wrapper for a MongodbConnector. Writes are accumulated per
+    collection and sent with unordered bulk writes when the buffer reaches
+    max_documents or max_bytes, or when flush() is invoked. Reads and any
+    other method are delegated to the wrapped connector.
+    """
+    def __init__(self, connector, max_documents=1000, max_bytes=16777216, on_error=None):
+        self._connector = connector
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        if on_error is None:
+            on_error = BufferedMongodbConnector._log_error
+        self._on_error = on_error
+
+        self._operations = dict()
+        self._documents = 0
+        self._bytes = 0
+        self._lock = Lock()
+        # Flushes are serialized, so a flush returns once earlier writes are done
+        self._flush_lock = Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._connector, name)
+
+    @property
+    def buffered_documents(self):
+        return self._documents
+
+    @staticmethod
+    def _log_error(document, error):
+        logging.error(f'document could not be written ({error}): {document}')
+
+    def _get_names(self, database_name, collection_name):
+        if not database_name:
+            database_name = getattr(self._connector, '_default_database', None)
+        if not collection_name:
+            collection_name = getattr(self._connector, '_default_collection', None)
+        if not database_name or not collection_name:
+            raise ValueError('database and collection names are required')
+        return database_name, collection_name
+
+    def _buffer(self, operation, document, database_name, collection_name):
+        names = self._get_names(database_name, collection_name)
+        size = len(BSON.encode(document))
+
+        with self._lock:
+            self._operations.setdefault(names, []).append((operation, document, size))
+            self._documents += 1
+            self._bytes += size
+            full = len(self._operations[names]) >= self.max_documents \
+                or self._bytes >= self.max_bytes
+
+        if full:
+            self.flush()
+
+    def insert(self, value, database_name=None, collection_name=None):
+        document = dict(value)
+        self._buffer(InsertOne(document), document, database_name, collection_name)
+
+    def update(self, query, value, database_name=None, collection_name=None):
+        self._buffer(UpdateOne(query, {'$set': value}, upsert=True), value, database_name,
+                     collection_name)
+
+    def put(self, value, query=None, database_name=None, collection_name=None):
+        if query:
+            self.update(query, value, database_name, collection_name)
+        else:
+            self.insert(value, database_name, collection_name)
+
+    def flush(self):
+        """ Returns the list of (document, error) which could not be written. """
+        failed = []
+        with self._flush_lock:
+            # Writers are not blocked during the bulk writes
+            with self._lock:
+                pending = list(self._operations.items())
+                self._operations = dict()
+                self._documents = 0
+                self._bytes = 0
+
+            for i, (names, operations) in enumerate(pending):
+                database_name, collection_name = names
+                try:
+                    self._connector.open_connection()
+                    collection = self._connector.client[database_name][collection_name]
+                    collection.bulk_write([operation for operation, _, _ in operations],
+                                          ordered=False)
+                except BulkWriteError as error:
+                    for write_error in error.details.get('writeErrors', []):
+                        document = operations[write_error['index']][1]
+                        failed.append((document, write_error.get('errmsg')))
+                except Exception:
+                    # Other errors keep the pending collections buffered
+                    self._restore(pending[i:])
+                    raise
+
+        for document, error in failed:
+            self._on_error(document, error)
+        return failed
+
+    def _restore(self, pending):
+        with self._lock:
+            for names, operations in pending:
+                self._operations[names] = operations + self._operations.get(names, [])
+                self._documents += len(operations)
+                self._bytes += sum(size for _, _, size in operations)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from pickle5 import pickle
+from . import utils
+
+
+def _get_default_key(key=None, *_, **__):
+    return key
+
+
+def _get_default_write(*args, **kwargs):
+    """ put(key, value); the value is only known without further arguments. """
+    if len(args) == 2 and not kwargs:
+        return args[0], args[1]
+    return _get_default_key(*args, **kwargs), None
+
+
+def _get_mongodb_key(query=None, *_, **__):
+    return query
+
+
+def _get_mongodb_write(value, query=None, *_, **__):
+    # Inserts (without query) may match any lookup
+    return query, None
+
+
+def _get_aerospike_key(key, *_, **__):
+    return key
+
+
+def _get_aerospike_write(key, *_, **__):
+    # The record returned by get() depends on the bins and on store_key
+    return key, None
+
+
+class CachedConnector:
+    """
+    Read-through cache for the get() method of a connector, bounded by max_items
+    and max_bytes (LRU) and with entries expiring after ttl seconds. Misses
+    (None results) are cached for negative_ttl seconds. Concurrent misses of the
+    same lookup are resolved by a single call to the connector.
+
+    Lookups are indexed by the key of their get() call: get_key(*args, **kwargs)
+    returns it. Writes through put() are delegated to the connector and invalidate
+    the lookups of the key returned by get_write(*args, **kwargs) as (key, value),
+    or every lookup if the key is None. If write_through is set and the value is
+    known, it is cached as the result of get(key) instead (e.g., RocksDB). Both
+    functions default to those of the connector (see CONNECTOR_KEYS) or to
+    get(key, ...) and put(key, value).
+
+    Results are returned as copies, so they can be modified by the caller.
+    """
+
+    # get_key and get_write of the connectors of the link, by class name
+    CONNECTOR_KEYS = {
+        'MongodbConnector': (_get_mongodb_key, _get_mongodb_write),
+        'AerospikeConnector': (_get_aerospike_key, _get_aerospike_write)
+    }
+
+    def __init__(self,
+                 connector,
+                 ttl=60,
+                 max_items=10000,
+                 max_bytes=None,
+                 negative_ttl=None,
+                 write_through=False,
+                 get_key=None,
+                 get_write=None):
+        self._connector = connector
+        default_get_key, default_get_write = CachedConnector.CONNECTOR_KEYS.get(
+            type(connector).__name__, (_get_default_key, _get_default_write))
+        if get_key is None:
+            get_key = default_get_key
+        self._get_key = get_key
+        if get_write is None:
+            get_write = default_get_write
+        self._get_write = get_write
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        if negative_ttl is None:
+            negative_ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.write_through = write_through
+
+        self._entries = OrderedDict()
+        self._lookups_by_key = dict()
+        self._bytes = 0
+        self._in_flight = dict()
+        self._lock = Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __getattr__(self, name):
+        return getattr(self._connector, name)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'items': len(self._entries),
+                'bytes': self._bytes
+            }
+
+    @staticmethod
+    def _get_key_id(key):
+        return pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _get_lookup(self, args, kwargs):
+        key_id = CachedConnector._get_key_id(self._get_key(*args, **kwargs))
+        lookup = pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL)
+        return key_id, lookup
+
+    @staticmethod
+    def _is_negative(result):
+        # Aerospike returns (None, None) for missing records
+        return result is None or result == (None, None) or result == []
+
+    def _remove(self, lookup):
+        key_id, _ = lookup
+        _, _, size, _ = self._entries.pop(lookup)
+        self._bytes -= size
+        lookups = self._lookups_by_key[key_id]
+        lookups.discard(lookup)
+        if not lookups:
+            del self._lookups_by_key[key_id]
+
+    def _store(self, lookup, result, is_iterator):
+        if lookup in self._entries:
+            self._remove(lookup)
+
+        if CachedConnector._is_negative(result):
+            ttl = self.negative_ttl
+        else:
+            ttl = self.ttl
+        if not ttl:
+            return
+        expiration = utils.get_timestamp_ms() + ttl * 1000
+
+        size = 0
+        if self.max_bytes is not None:
+            size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+            if size > self.max_bytes:
+                return
+
+        self._entries[lookup] = (result, expiration, size, is_iterator)
+        self._lookups_by_key.setdefault(lookup[0], set()).add(lookup)
+        self._bytes += size
+
+        while len(self._entries) > self.max_items \
+        or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    @staticmethod
+    def _get_output(result, is_iterator):
+        # Cached results are never handed out
+        result = copy.deepcopy(result)
+        if is_iterator:
+            return iter(result)
+        return result
+
+    def get(self, *args, **kwargs):
+        lookup = self._get_lookup(args, kwargs)
+
+        with self._lock:
+            if lookup in self._entries:
+                result, expiration, _, is_iterator = self._entries[lookup]
+                if expiration > utils.get_timestamp_ms():
+                    self._entries.move_to_end(lookup)
+                    self._hits += 1
+                    return CachedConnector._get_output(result, is_iterator)
+                self._remove(lookup)
+                self._expirations += 1
+
+            self._misses += 1
+            # Single flight: only the first miss queries the connector
+            future = self._in_flight.get(lookup)
+            leader = future is None
+            if leader:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._in_flight[lookup] = future
+
+        if not leader:
+            return CachedConnector._get_output(*future.result())
+
+        try:
+            result = self._connector.get(*args, **kwargs)
+            # Cursors are materialized so they can be replayed
+            is_iterator = hasattr(result, '__next__')
+            if is_iterator:
+                result = list(result)
+        except Exception as exception:
+            with self._lock:
+                self._in_flight.pop(lookup, None)
+            future.set_exception(exception)
+            raise
+
+        with self._lock:
+            # The entry may have been invalidated during the call
+            if self._in_flight.pop(lookup, None) is future:
+                self._store(lookup, result, is_iterator)
+        future.set_result((result, is_iterator))
+        return CachedConnector._get_output(result, is_iterator)
+
+    def put(self, *args, **kwargs):
+        output = self._connector.put(*args, **kwargs)
+        key, value = self._get_write(*args, **kwargs)
+        if key is None:
+            self.invalidate()
+            return output
+
+        self.invalidate([key])
+        if self.write_through and value is not None:
+            with self._lock:
+                self._store(self._get_lookup((key, ), {}), copy.deepcopy(value), False)
+        return output
+
+    def invalidate(self, keys=None):
+        """ Invalidate the lookups of the given keys or all of them. """
+        with self._lock:
+            if keys is None:
+                self._entries = OrderedDict()
+                self._lookups_by_key = dict()
+                self._bytes = 0
+                self._in_flight = dict()
+                return
+
+            for key in keys:
+                key_id = CachedConnector._get_key_id(key)
+                for lookup in list(self._lookups_by_key.get(key_id, [])):
+                    self._remove(lookup)
+                for lookup in [lookup for lookup in self._in_flight if lookup[0] == key_id]:
+                    del self._in_flight[lookup]
+
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .link import Link
+
+
+class Chain(Link):
+    """
+    Several links fused in a single process. The electrons sent or returned by a
+    stage are transformed by the next one in the same thread, without Kafka in
+    between; only the output of the last stage is produced. Input messages are
+    committed once the last stage is done with them.
+
+        Chain([Mapper, Reducer]).start()
+
+    Stages are Link classes or instances which are never started themselves: the
+    chain runs their setup(), finish() and the generator() of the first one. Their
+    loops run and stop with those of the chain.
+    """
+    def __init__(self, stages, **kwargs):
+        super().__init__(**kwargs)
+
+        if not stages:
+            raise ValueError('a chain needs at least one stage')
+
+        self._stages = []
+        for stage in stages:
+            if isinstance(stage, type):
+                stage = stage(log_level=self._log_level)
+            self._stages.append(stage)
+
+        for stage, downstream in zip(self._stages, self._stages[1:] + [self]):
+            stage._chain = self
+            stage._downstream = downstream
+            stage._synchronous = self._synchronous
+            stage._sequential = self._sequential
+            # The generator of the first stage waits for the output queue of the chain
+            stage._output_messages = self._output_messages
+            # Loops and threads of the stages are stopped with those of the chain
+            self._safe_stop_threads += stage._safe_stop_threads
+            stage._safe_stop_threads = self._safe_stop_threads
+            stage._scheduler = self._scheduler
+
+        self.logger.log(f'stages: {[type(stage).__name__ for stage in self._stages]}')
+
+    @property
+    def stages(self):
+        return list(self._stages)
+
+    def setup(self):
+        for stage in self._stages:
+            stage.setup()
+
+    def finish(self):
+        for stage in self._stages:
+            stage.finish()
+
+    def _generator(self):
+        self._stages[0]._generator()
+
+    def _transform(self, electron, commit_callback, release_callback=None):
+        self._stages[0]._transform(electron, commit_callback, release_callback)
+
+    def _receive(self, electrons):
+        # Output of the last stage
+        self.send_many(electrons)
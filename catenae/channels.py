@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import mmap
+import struct
+import time
+import zlib
+import multiprocessing
+from itertools import count
+from threading import current_thread
+from pickle5 import pickle
+
+# Shared-memory channels which replace Kafka for links run by a Topology. They are
+# created before the processes are forked, so every process maps the same memory.
+
+# Timestamp type of the messages, as confluent_kafka.TIMESTAMP_CREATE_TIME
+TIMESTAMP_CREATE_TIME = 1
+
+
+def get_context():
+    # Anonymous shared memory is only inherited by forked processes
+    return multiprocessing.get_context('fork')
+
+
+class RingBuffer:
+    """ Bounded queue of byte records. It has no lock of its own, see Inbox. """
+
+    # Written and read bytes, since the creation of the buffer
+    HEADER = struct.Struct('<QQ')
+    LENGTH = struct.Struct('<I')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._memory = mmap.mmap(-1, RingBuffer.HEADER.size + capacity)
+
+    def _get_counters(self):
+        return RingBuffer.HEADER.unpack_from(self._memory, 0)
+
+    def __len__(self):
+        written, read = self._get_counters()
+        return written - read
+
+    def get_free(self):
+        return self.capacity - len(self)
+
+    def _write(self, position, data):
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        start = RingBuffer.HEADER.size
+        self._memory[start + offset:start + offset + first] = data[:first]
+        if first < len(data):
+            self._memory[start:start + len(data) - first] = data[first:]
+
+    def _read(self, position, size):
+        offset = position % self.capacity
+        first = min(size, self.capacity - offset)
+        start = RingBuffer.HEADER.size
+        data = self._memory[start + offset:start + offset + first]
+        if first < size:
+            data += self._memory[start:start + size - first]
+        return data
+
+    def put(self, data):
+        size = RingBuffer.LENGTH.size + len(data)
+        if size > self.get_free():
+            return False
+        written, read = self._get_counters()
+        self._write(written, RingBuffer.LENGTH.pack(len(data)))
+        self._write(written + RingBuffer.LENGTH.size, memoryview(data))
+        RingBuffer.HEADER.pack_into(self._memory, 0, written + size, read)
+        return True
+
+    def get(self):
+        written, read = self._get_counters()
+        if written == read:
+            return None
+        size, = RingBuffer.LENGTH.unpack(self._read(read, RingBuffer.LENGTH.size))
+        data = self._read(read + RingBuffer.LENGTH.size, size)
+        RingBuffer.HEADER.pack_into(self._memory, 0, written,
+                                    read + RingBuffer.LENGTH.size + size)
+        return data
+
+
+class Inbox:
+    """
+    Input of a link instance: a ring buffer per input topic. Any process can put
+    records and the instance gets them, waiting for any of its subscribed topics.
+    """
+    def __init__(self, topics, capacity):
+        self._condition = get_context().Condition()
+        self._buffers = {topic: RingBuffer(capacity) for topic in topics}
+        self._next = 0
+
+    @property
+    def topics(self):
+        return list(self._buffers)
+
+    def put(self, topic, data, timeout=None):
+        buffer = self._buffers[topic]
+        if RingBuffer.LENGTH.size + len(data) > buffer.capacity:
+            raise ValueError(f'record of {len(data)} bytes, channel capacity: {buffer.capacity}')
+        with self._condition:
+            if not self._condition.wait_for(lambda: buffer.put(data), timeout):
+                return False
+            self._condition.notify_all()
+        return True
+
+    def notify(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def get(self, topics, timeout=None, interrupted=None):
+        """
+        The next (topic, record) of the given topics, round-robin. None on timeout or
+        if interrupted() is true once the waiting threads are notified.
+        """
+        buffers = [(topic, self._buffers[topic]) for topic in topics if topic in self._buffers]
+        if interrupted is None:
+            interrupted = lambda: False
+
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: interrupted() or any(len(buffer) for _, buffer in buffers), timeout):
+                return None
+            for i in range(len(buffers)):
+                topic, buffer = buffers[(self._next + i) % len(buffers)]
+                data = buffer.get()
+                if data is not None:
+                    self._next = (self._next + i + 1) % len(buffers)
+                    self._condition.notify_all()
+                    return topic, data
+        return None
+
+
+class ChannelMessage:
+    """ Same interface as the messages of confluent_kafka. """
+    def __init__(self, topic, partition, offset, key, value, headers=None, timestamp=None):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp = timestamp
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return self._headers
+
+    def timestamp(self):
+        return TIMESTAMP_CREATE_TIME, self._timestamp
+
+    def error(self):
+        return None
+
+
+class ChannelConsumer:
+    """ Reads the inbox of a link instance, as a confluent_kafka Consumer. """
+    def __init__(self, inbox, partition=0):
+        self._inbox = inbox
+        self._partition = partition
+        self._subscription = []
+        self._paused = False
+        self._woken_up = False
+        self._offsets = dict()
+
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        self._subscription = list(topics)
+
+    def assignment(self):
+        return [topic for topic in self._subscription if topic in self._inbox.topics]
+
+    def pause(self, _):
+        self._paused = True
+
+    def resume(self, _):
+        self._paused = False
+
+    def wake_up(self):
+        """ A poll waiting for messages returns None, e.g., when the link is stopping. """
+        self._woken_up = True
+        self._inbox.notify()
+
+    def poll(self, timeout=None):
+        if self._paused:
+            time.sleep(timeout or 0)
+            return None
+
+        record = self._inbox.get(self._subscription, timeout, lambda: self._woken_up)
+        if record is None:
+            self._woken_up = False
+            return None
+        topic, data = record
+        key, value, headers, timestamp = pickle.loads(data)
+
+        offset = self._offsets.get(topic, 0)
+        self._offsets[topic] = offset + 1
+        return ChannelMessage(topic, self._partition, offset, key, value, headers, timestamp)
+
+    def commit(self, message=None, asynchronous=True):
+        # Records are removed from the channel when they are read
+        pass
+
+    def position(self, partitions):
+        return partitions
+
+    def committed(self, partitions):
+        return []
+
+    def consumer_group_metadata(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class ChannelProducer:
+    """
+    Writes to the inboxes of the subscribers of every topic, as a confluent_kafka
+    Producer. Each subscribed link gets every message, in the inbox of one of its
+    instances: by the hash of the key or round-robin.
+    """
+
+    PUT_TIMEOUT = 0.5
+
+    def __init__(self, routes):
+        # Topic -> list of the inboxes of the instances of every subscribed link
+        self._routes = routes
+        self._counter = count()
+
+    def produce(self, topic, key=None, value=None, headers=None, on_delivery=None, **_):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        timestamp = int(time.time() * 1000)
+        data = pickle.dumps((key, value, headers, timestamp), protocol=pickle.HIGHEST_PROTOCOL)
+
+        if key is None:
+            index = next(self._counter)
+        else:
+            index = zlib.crc32(key)
+
+        # The channels are bounded, wait until the subscribers catch up
+        for inboxes in self._routes.get(topic, []):
+            inbox = inboxes[index % len(inboxes)]
+            while not inbox.put(topic, data, ChannelProducer.PUT_TIMEOUT):
+                if getattr(current_thread(), 'will_stop', False):
+                    return
+
+        if on_delivery is not None:
+            on_delivery(None, ChannelMessage(topic, None, None, key, value, headers, timestamp))
+
+    def poll(self, timeout=None):
+        return 0
+
+    def flush(self, timeout=None):
+        return 0
+
+    # Messages are delivered when they are produced, transactions are no-ops
+
+    def init_transactions(self, timeout=None):
+        pass
+
+    def begin_transaction(self):
+        pass
+
+    def send_offsets_to_transaction(self, positions, group_metadata, timeout=None):
+        pass
+
+    def commit_transaction(self, timeout=None):
+        pass
+
+    def abort_transaction(self, timeout=None):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class Channels:
+    """ The channels of a link instance: its inbox and the routes of its output. """
+    def __init__(self, inbox, routes, partition=0):
+        self._inbox = inbox
+        self._partition = partition
+        self.producer = ChannelProducer(routes)
+
+    def get_consumer(self):
+        if self._inbox is None:
+            return ChannelConsumer(Inbox([], 0), self._partition)
+        return ChannelConsumer(self._inbox, self._partition)
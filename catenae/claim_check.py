@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+from uuid import uuid4
+from . import utils
+from . import errors
+from . import serialization
+
+
+class BlobStore:
+    """ Storage of the values too big to be produced. Blobs expire after ttl seconds. """
+    def put(self, blob_id, data, ttl=None):
+        raise NotImplementedError
+
+    def get(self, blob_id):
+        raise NotImplementedError
+
+    def delete(self, blob_id):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def _get_expiration(ttl):
+        if ttl is None:
+            return 0
+        return utils.get_timestamp() + ttl
+
+    @staticmethod
+    def _is_expired(expiration):
+        return expiration and expiration <= utils.get_timestamp()
+
+
+class FileBlobStore(BlobStore):
+    """ A blob per file, e.g., in a volume shared by all the links. """
+
+    # Expiration timestamp, 0 if the blob does not expire
+    HEADER = struct.Struct('<q')
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _get_path(self, blob_id):
+        return os.path.join(self.path, blob_id[:2], blob_id)
+
+    def put(self, blob_id, data, ttl=None):
+        path = self._get_path(blob_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers never see partial blobs
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'wb') as blob_file:
+            blob_file.write(FileBlobStore.HEADER.pack(BlobStore._get_expiration(ttl)))
+            blob_file.write(data)
+        os.replace(temporary_path, path)
+
+    def get(self, blob_id):
+        try:
+            with open(self._get_path(blob_id), 'rb') as blob_file:
+                expiration, = FileBlobStore.HEADER.unpack(
+                    blob_file.read(FileBlobStore.HEADER.size))
+                if BlobStore._is_expired(expiration):
+                    return None
+                return blob_file.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, blob_id):
+        try:
+            os.remove(self._get_path(blob_id))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self):
+        for directory, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    with open(path, 'rb') as blob_file:
+                        expiration, = FileBlobStore.HEADER.unpack(
+                            blob_file.read(FileBlobStore.HEADER.size))
+                    if BlobStore._is_expired(expiration):
+                        os.remove(path)
+                except (FileNotFoundError, struct.error):
+                    continue
+
+
+class RocksDBBlobStore(BlobStore):
+    """ Blobs in the RocksDB database of the link; readers must access the same database. """
+    def __init__(self, rocksdb, namespace='blob'):
+        self._rocksdb = rocksdb
+        self._namespace = namespace
+
+    def _get_key(self, blob_id):
+        return f'{self._namespace}:{blob_id}'
+
+    def put(self, blob_id, data, ttl=None):
+        self._rocksdb.put(self._get_key(blob_id), (BlobStore._get_expiration(ttl), data))
+
+    def get(self, blob_id):
+        entry = self._rocksdb.get(self._get_key(blob_id))
+        if entry is None or BlobStore._is_expired(entry[0]):
+            return None
+        return entry[1]
+
+    def delete(self, blob_id):
+        self._rocksdb.delete(self._get_key(blob_id))
+
+    def purge_expired(self):
+        for key, entry in self._rocksdb.scan(prefix=f'{self._namespace}:'):
+            if BlobStore._is_expired(entry[0]):
+                self._rocksdb.delete(key)
+
+
+class ClaimCheck:
+    """
+    Reference to a value in a blob store, which is produced instead of the value.
+    It is loaded when the value of the electron is accessed; forwarding the electron
+    untouched forwards the reference. Blobs are the serialized electrons.
+    """
+    def __init__(self, blob_id=None, size=None):
+        if blob_id is None:
+            blob_id = uuid4().hex
+        self.blob_id = blob_id
+        self.size = size
+        self.store = None
+
+    def __getstate__(self):
+        return {'blob_id': self.blob_id, 'size': self.size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.store = None
+
+    def __deepcopy__(self, _):
+        return self
+
+    def load(self):
+        if self.store is None:
+            raise errors.BlobNotFoundError(f'no blob store for {self.blob_id}')
+        data = self.store.get(self.blob_id)
+        if data is None:
+            raise errors.BlobNotFoundError(self.blob_id)
+        return serialization.loads(data).value
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+class ColumnSchema:
+    """
+    Declared schema of the input values, as a list of (name, dtype) or a dict
+    of NumPy dtypes. Values (dicts or sequences in the same order) are gathered
+    into NumPy structured arrays or Arrow record batches depending on column_format.
+    """
+
+    FORMATS = ['numpy', 'arrow']
+
+    def __init__(self, fields, column_format='numpy'):
+        if isinstance(fields, dict):
+            fields = list(fields.items())
+        if column_format not in ColumnSchema.FORMATS:
+            raise ValueError(f'unknown column format: {column_format}')
+        self.fields = fields
+        self.names = [name for name, _ in fields]
+        self.column_format = column_format
+
+    @property
+    def dtype(self):
+        import numpy
+
+        return numpy.dtype(self.fields)
+
+    def get_row(self, value):
+        if isinstance(value, dict):
+            return tuple(value[name] for name in self.names)
+        return tuple(value)
+
+    def to_batch(self, rows):
+        import numpy
+
+        array = numpy.array(rows, dtype=self.dtype)
+        if self.column_format == 'numpy':
+            return array
+        return ColumnSchema.to_arrow(array)
+
+    def convert(self, batch):
+        """ The batch in the column format of the schema. """
+        if ColumnSchema.is_arrow(batch):
+            if self.column_format == 'arrow':
+                return batch
+            return self.to_batch(list(zip(*[column.to_pylist() for column in batch.columns])))
+        if self.column_format == 'numpy':
+            return batch
+        return ColumnSchema.to_arrow(batch)
+
+    @staticmethod
+    def is_arrow(batch):
+        return type(batch).__module__.startswith('pyarrow')
+
+    @staticmethod
+    def is_batch(value):
+        if ColumnSchema.is_arrow(value):
+            return True
+        return type(value).__module__ == 'numpy' and getattr(value.dtype, 'names', None) is not None
+
+    @staticmethod
+    def to_arrow(array):
+        import pyarrow
+
+        names = array.dtype.names
+        return pyarrow.RecordBatch.from_arrays([array[name] for name in names], names=names)
+
+    @staticmethod
+    def to_rows(batch):
+        """ A dict per row. """
+        if ColumnSchema.is_arrow(batch):
+            names = batch.schema.names
+            columns = [column.to_pylist() for column in batch.columns]
+        else:
+            names = batch.dtype.names
+            columns = [batch[name].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+from threading import Lock, local
+
+
+class DictionaryCompressor:
+    """
+    Value-level zstd compression with dictionaries trained per topic. Samples of the
+    values of every topic, up to MAX_SAMPLES_BYTES, are kept until train() builds a
+    new version of its dictionary, which is used once activated. Any version is
+    decompressed by id.
+    """
+
+    DICTIONARY_SIZE = 16384
+    MIN_SAMPLES = 1000
+    MAX_SAMPLES_BYTES = 4194304
+    MAX_SAMPLE_SIZE = 65536
+    RETRAIN_INTERVAL = 3600
+    LEVEL = 3
+
+    def __init__(self, dictionary_size=None, level=None, retrain_interval=None):
+        if dictionary_size is None:
+            dictionary_size = DictionaryCompressor.DICTIONARY_SIZE
+        self.dictionary_size = dictionary_size
+        if level is None:
+            level = DictionaryCompressor.LEVEL
+        self.level = level
+        if retrain_interval is None:
+            retrain_interval = DictionaryCompressor.RETRAIN_INTERVAL
+        self.retrain_interval = retrain_interval
+
+        self._samples = dict()
+        self._seen_samples = dict()
+        self._samples_bytes = dict()
+        self._dictionaries = dict()
+        self._active = dict()
+        self._lock = Lock()
+        # zstd (de)compressors cannot be shared among threads
+        self._local = local()
+
+    def has(self, dictionary_id):
+        return dictionary_id in self._dictionaries
+
+    def add(self, dictionary_id, data):
+        import zstandard
+
+        with self._lock:
+            self._dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+
+    def get_data(self, dictionary_id):
+        return self._dictionaries[dictionary_id].as_bytes()
+
+    def activate(self, topic, dictionary_id):
+        with self._lock:
+            self._active[topic] = dictionary_id
+
+    def _sample(self, topic, value):
+        size = len(value)
+        if size > DictionaryCompressor.MAX_SAMPLE_SIZE:
+            return
+        with self._lock:
+            samples = self._samples.setdefault(topic, [])
+            seen = self._seen_samples.get(topic, 0) + 1
+            self._seen_samples[topic] = seen
+            samples_bytes = self._samples_bytes.get(topic, 0)
+            if samples_bytes + size <= DictionaryCompressor.MAX_SAMPLES_BYTES:
+                samples.append(value)
+                self._samples_bytes[topic] = samples_bytes + size
+                return
+
+            # Reservoir sampling once the samples are full
+            index = random.randrange(seen)
+            if index >= len(samples):
+                return
+            samples_bytes += size - len(samples[index])
+            if samples_bytes <= DictionaryCompressor.MAX_SAMPLES_BYTES:
+                samples[index] = value
+                self._samples_bytes[topic] = samples_bytes
+
+    def needs_training(self, topic):
+        """ Dictionaries are trained every retrain_interval (see Link). """
+        return len(self._samples.get(topic, [])) >= DictionaryCompressor.MIN_SAMPLES
+
+    @property
+    def topics(self):
+        return list(self._samples)
+
+    def train(self, topic):
+        """ New dictionary (id, data) for the topic, not activated yet. """
+        import zstandard
+
+        with self._lock:
+            samples = self._samples.pop(topic, [])
+            self._seen_samples.pop(topic, None)
+            self._samples_bytes.pop(topic, None)
+
+        dictionary = zstandard.train_dictionary(self.dictionary_size, samples, level=self.level)
+        dictionary_id = dictionary.dict_id()
+        with self._lock:
+            self._dictionaries[dictionary_id] = dictionary
+        return dictionary_id, dictionary.as_bytes()
+
+    def _get_compressor(self, dictionary_id):
+        import zstandard
+
+        if not hasattr(self._local, 'compressors'):
+            self._local.compressors = dict()
+            self._local.decompressors = dict()
+        if dictionary_id not in self._local.compressors:
+            self._local.compressors[dictionary_id] = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._dictionaries[dictionary_id])
+        return self._local.compressors[dictionary_id]
+
+    def _get_decompressor(self, dictionary_id):
+        import zstandard
+
+        if not hasattr(self._local, 'decompressors'):
+            self._local.compressors = dict()
+            self._local.decompressors = dict()
+        if dictionary_id not in self._local.decompressors:
+            self._local.decompressors[dictionary_id] = zstandard.ZstdDecompressor(
+                dict_data=self._dictionaries[dictionary_id])
+        return self._local.decompressors[dictionary_id]
+
+    def compress(self, topic, value):
+        """ The id of the dictionary used (None if there is not any yet) and the value. """
+        self._sample(topic, value)
+        dictionary_id = self._active.get(topic)
+        if dictionary_id is None:
+            return None, value
+        return dictionary_id, self._get_compressor(dictionary_id).compress(value)
+
+    def decompress(self, dictionary_id, value):
+        return self._get_decompressor(dictionary_id).decompress(value)
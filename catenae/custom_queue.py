@@ -2,9 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import threading
-import multiprocessing
-import time
-from .utils import get_timestamp
+from collections import deque
 from .errors import EmptyError
 
 
@@ -25,49 +23,72 @@ class CustomQueue:
 class ThreadingQueue(CustomQueue):
     def __init__(self, size=0, circular=False):
         super().__init__(size, circular)
-        self._queue = list()
+        self._queue = deque()
         self._lock = threading.Lock()
+        # Waiting threads are woken up as soon as the queue changes
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._interrupted = False
+
+    def __len__(self):
+        return len(self._queue)
 
     def _truncate(self):
         if self._size > 0 and len(self._queue) > self._size:
-            self._queue.pop(0)
+            self._queue.popleft()
+
+    def _is_full(self):
+        return self._size > 0 and len(self._queue) >= self._size
 
     def put(self, item, block=True, timeout=None):
-        if self._circular:
-            self._lock.acquire()
+        with self._lock:
+            if self._circular:
+                self._queue.append(item)
+                self._truncate()
+                self._not_empty.notify()
+                return
+
+            if self._is_full():
+                if not block:
+                    raise EmptyError
+                if not self._not_full.wait_for(lambda: not self._is_full(), timeout):
+                    raise EmptyError
+
             self._queue.append(item)
-            self._truncate()
-            self._lock.release()
+            self._not_empty.notify()
+
+    def put_many(self, items):
+        if self._size > 0 and not self._circular:
+            for item in items:
+                self.put(item)
             return
 
-        start_timestamp = get_timestamp()
-        while timeout is None or get_timestamp() - start_timestamp < timeout:
-            self._lock.acquire()
-            if self._size <= 0 or len(self._queue) < self._size:
-                self._queue.append(item)
-                self._lock.release()
-                return
-            self._lock.release()
-            if not block:
-                raise EmptyError
-            time.sleep(ThreadingQueue.BLOCKING_SECONDS)
+        with self._lock:
+            self._queue.extend(items)
+            if self._circular:
+                while len(self._queue) > self._size > 0:
+                    self._queue.popleft()
+            self._not_empty.notify(len(items))
+
+    def wait_until_below(self, length, timeout=None):
+        with self._lock:
+            return self._not_full.wait_for(lambda: len(self._queue) < length, timeout)
+
+    def interrupt(self):
+        """ Getters do not wait anymore, e.g., when the link is stopping. """
+        with self._lock:
+            self._interrupted = True
+            self._not_empty.notify_all()
 
     def get(self, block=True, timeout=None):
-        if timeout is not None:
-            block = False
-
-        start_timestamp = get_timestamp()
-        while timeout is None or get_timestamp() - start_timestamp < timeout:
-            self._lock.acquire()
-            if len(self._queue) > 0:
-                item = self._queue.pop(0)
-                self._lock.release()
-                return item
-
-            self._lock.release()
-            if timeout is None and not block:
-                raise EmptyError
-            time.sleep(ThreadingQueue.BLOCKING_SECONDS)
-
-        if not block:
-            raise EmptyError
+        with self._lock:
+            if not self._queue:
+                if (timeout is None and not block) or self._interrupted:
+                    raise EmptyError
+                if not self._not_empty.wait_for(lambda: self._queue or self._interrupted,
+                                                timeout) or not self._queue:
+                    raise EmptyError
+
+            item = self._queue.popleft()
+            self._not_full.notify()
+            return item
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import threading
+import time
+from contextlib import contextmanager
 from .custom_queue import ThreadingQueue
 from .errors import EmptyError
 
@@ -10,6 +12,15 @@ def should_stop():
     return threading.current_thread().will_stop
 
 
+def wait(timeout):
+    """ Sleep which ends as soon as the current thread is stopped. True if stopped. """
+    thread = threading.current_thread()
+    if isinstance(thread, Thread):
+        return thread.wait(timeout)
+    time.sleep(timeout)
+    return False
+
+
 class Thread(threading.Thread):
     def __init__(self, target, args=None, kwargs=None):
         if args is None:
@@ -23,26 +34,153 @@ class Thread(threading.Thread):
             kwargs = dict()
 
         super().__init__(target=target, args=args, kwargs=kwargs)
-        self._will_stop = False
+        self._will_stop = threading.Event()
 
     def stop(self):
-        self._will_stop = True
+        self._will_stop.set()
 
     @property
     def will_stop(self):
-        return self._will_stop
+        return self._will_stop.is_set()
+
+    def wait(self, timeout=None):
+        return self._will_stop.wait(timeout)
+
+
+class SharedLock:
+    """
+    Readers-writer lock. It is acquired exclusively as a regular lock and
+    in shared mode with shared(). Exclusive acquisitions have preference.
+    Shared acquisitions are re-entrant per thread, exclusive ones are not.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._shared_holders = 0
+        self._exclusive_holder = False
+        self._exclusive_waiters = 0
+        # Shared acquisitions held by the current thread
+        self._local = threading.local()
+
+    def acquire(self):
+        with self._condition:
+            self._exclusive_waiters += 1
+            self._condition.wait_for(
+                lambda: not self._exclusive_holder and not self._shared_holders)
+            self._exclusive_waiters -= 1
+            self._exclusive_holder = True
+
+    def release(self):
+        with self._condition:
+            self._exclusive_holder = False
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *_):
+        self.release()
+
+    @contextmanager
+    def shared(self):
+        depth = getattr(self._local, 'depth', 0)
+        # Nested acquisitions do not wait for exclusive waiters, which wait for this thread
+        if not depth:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: not self._exclusive_holder and not self._exclusive_waiters)
+                self._shared_holders += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._condition:
+                    self._shared_holders -= 1
+                    if not self._shared_holders:
+                        self._condition.notify_all()
 
 
 class ThreadPool:
-    def __init__(self, link_instance, num_threads=1):
+    """
+    Pool of worker threads between num_threads and max_threads. A thread is added
+    when the queue has been backing up for SCALE_INTERVAL seconds and tasks
+    spend most of their time off the CPU (I/O); idle threads over the minimum
+    exit after IDLE_TIMEOUT seconds.
+    """
+
+    GET_TIMEOUT = 1
+    SCALE_INTERVAL = 1
+    IDLE_TIMEOUT = 30
+    MIN_IO_RATIO = 0.5
+    STATS_DECAY = 0.9
+
+    def __init__(self, link_instance, num_threads=1, max_threads=None):
         self.link_instance = link_instance
         self.tasks_queue = ThreadingQueue()
         self.threads = []
+        self.min_threads = num_threads
+        if max_threads is None or max_threads < num_threads:
+            max_threads = num_threads
+        self.max_threads = max_threads
 
-        for i in range(num_threads):
-            thread = Thread(self._worker_target, i)
-            self.threads.append(thread)
-            thread.start()
+        self._lock = threading.Lock()
+        # Submitted tasks which are not done yet
+        self._idle = threading.Condition(self._lock)
+        self._pending_tasks = 0
+        self._stopped = False
+        self._backlog_since = None
+        self._wall_time = 0.
+        self._cpu_time = 0.
+        self._workers = dict()
+
+        for _ in range(num_threads):
+            self._add_thread()
+
+    @property
+    def io_ratio(self):
+        """ Fraction of the recent task time not spent on the CPU """
+        with self._lock:
+            if not self._wall_time:
+                return 0.
+            return max(0., 1 - self._cpu_time / self._wall_time)
+
+    @property
+    def utilization(self):
+        """ Fraction of its lifetime every worker has been busy """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: worker['busy_time'] / max(now - worker['start_time'], 1e-9)
+                for name, worker in self._workers.items()
+            }
+
+    def _add_thread(self):
+        thread = Thread(self._worker_target)
+        self.threads.append(thread)
+        self._workers[thread.name] = {'start_time': time.monotonic(), 'busy_time': 0., 'tasks': 0}
+        thread.start()
+
+    def _remove_thread(self, thread):
+        with self._lock:
+            if self._stopped or len(self.threads) <= self.min_threads:
+                return False
+            self.threads.remove(thread)
+            del self._workers[thread.name]
+            return True
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            for thread in self.threads:
+                thread.stop()
+        # Idle workers return right away
+        self.tasks_queue.interrupt()
+
+    def wait_idle(self, timeout=None):
+        """ Wait until every submitted task is done. """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending_tasks, timeout)
 
     def submit(self, target, args=None, kwargs=None):
         if args is None:
@@ -54,14 +192,69 @@ class ThreadPool:
         if kwargs is None:
             kwargs = {}
 
+        with self._lock:
+            self._pending_tasks += 1
         self.tasks_queue.put((target, args, kwargs))
+        if len(self.threads) < self.max_threads:
+            self._autoscale()
 
-    def _worker_target(self, index):
-        while not self.threads[index].will_stop:
+    def _autoscale(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._stopped or not self.tasks_queue:
+                self._backlog_since = None
+                return
+            if self._backlog_since is None:
+                self._backlog_since = now
+                return
+            if now - self._backlog_since < ThreadPool.SCALE_INTERVAL:
+                return
+            self._backlog_since = now
+
+            if len(self.threads) >= self.max_threads:
+                return
+            if not self._wall_time \
+            or 1 - self._cpu_time / self._wall_time < ThreadPool.MIN_IO_RATIO:
+                return
+            self._add_thread()
+        self.link_instance.logger.log(f'thread pool grown to {len(self.threads)} threads',
+                                      level='debug')
+
+    def _record_task(self, thread, wall_time, cpu_time):
+        with self._lock:
+            self._wall_time = self._wall_time * ThreadPool.STATS_DECAY + wall_time
+            self._cpu_time = self._cpu_time * ThreadPool.STATS_DECAY + cpu_time
+            worker = self._workers.get(thread.name)
+            if worker is not None:
+                worker['busy_time'] += wall_time
+                worker['tasks'] += 1
+
+    def _worker_target(self):
+        thread = threading.current_thread()
+        idle_since = time.monotonic()
+        while not thread.will_stop:
             try:
-                target, args, kwargs = self.tasks_queue.get(timeout=1, block=False)
-                target(*args, **kwargs)
+                target, args, kwargs = self.tasks_queue.get(timeout=ThreadPool.GET_TIMEOUT)
             except EmptyError:
-                pass
+                if time.monotonic() - idle_since > ThreadPool.IDLE_TIMEOUT \
+                and self._remove_thread(thread):
+                    self.link_instance.logger.log(
+                        f'thread pool shrunk to {len(self.threads)} threads', level='debug')
+                    return
+                continue
+
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            try:
+                target(*args, **kwargs)
             except Exception:
-                self.link_instance.logger.log(f'exception during the execution of a task', level='exception')
+                self.link_instance.logger.log(f'exception during the execution of a task',
+                                              level='exception')
+            finally:
+                with self._lock:
+                    self._pending_tasks -= 1
+                    if not self._pending_tasks:
+                        self._idle.notify_all()
+            self._record_task(thread, time.perf_counter() - wall_start,
+                              time.thread_time() - cpu_start)
+            idle_since = time.monotonic()
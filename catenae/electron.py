@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import copy
+from .claim_check import ClaimCheck
 
 
 class Electron:
@@ -12,7 +13,8 @@ class Electron:
                  previous_topic=None,
                  unpack_if_string=False,
                  callbacks=None,
-                 timestamp=None):
+                 timestamp=None,
+                 partition=None):
         self.key = key
         self.value = value
         self.topic = topic  # Destination topic
@@ -23,28 +25,53 @@ class Electron:
         else:
             self.callbacks = callbacks
         self.timestamp = timestamp
+        self.partition = partition  # Source partition
+
+    @property
+    def value(self):
+        # Values over the claim check threshold are loaded on first access
+        if isinstance(self._value, ClaimCheck):
+            self._value = self._value.load()
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['value'] = state.pop('_value')
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        state['_value'] = state.pop('value', None)
+        self.__dict__.update(state)
 
     def __bool__(self):
-        if self.value != None:
+        if self._value is not None:
             return True
         return False
 
     def get_sendable(self):
-        copy = self.copy()
+        # It is serialized right away, the value is not copied
+        copy = Electron(key=self.key, value=self._value)
         copy.topic = None
         copy.previous_topic = None
         copy.unpack_if_string = False
         copy.callbacks = []
         copy.timestamp = None
+        copy.partition = None
         return copy
 
     def copy(self):
         electron = Electron()
         electron.key = self.key
-        electron.value = copy.deepcopy(self.value)
+        electron.value = copy.deepcopy(self._value)
         electron.topic = self.topic
         electron.previous_topic = self.previous_topic
         electron.unpack_if_string = self.unpack_if_string
         electron.callbacks = self.callbacks
         electron.timestamp = self.timestamp
+        electron.partition = self.partition
         return electron
@@ -32,3 +32,7 @@ class InvalidParamsError(RPCError):
 
 class InternalError(RPCError):
     pass
+
+
+class BlobNotFoundError(Exception):
+    pass
@@ -29,33 +29,41 @@
 
 import catenae
 import math
-from threading import Lock, current_thread
+import copy
+import inspect
+from itertools import islice
+from threading import Event, Lock, RLock, current_thread
+from concurrent.futures import Future
 from multiprocessing import Pipe
 from pickle5 import pickle
 import time
 import argparse
 from os import environ
-from confluent_kafka import Producer, Consumer, KafkaError, KafkaException
 import signal
 from urllib.request import urlopen, Request
 from urllib.error import HTTPError
 from socket import timeout
 import json
-import eventlet
-from easyaerospike import AerospikeConnector
-from easymongo import MongodbConnector
-from easyrocks import DB as RocksDB
-import traceback
 from . import utils
 from . import errors
+from . import serialization
+from . import custom_threading
 from .electron import Electron
 from .callback import Callback
 from .logger import Logger
 from .custom_queue import ThreadingQueue
-from .custom_threading import Thread, ThreadPool
+from .custom_threading import Thread, ThreadPool, SharedLock
 from .custom_multiprocessing import Process
-from .json_rpc import JsonRPC
+from .scheduler import Scheduler
 from .structures import CircularOrderedSet
+from .caching import CachedConnector
+from .backpressure import InFlightLimiter
+from .throttling import RateLimiter
+from .polling import AdaptiveTimeout
+from .spill import SpillBuffer
+from .compression import DictionaryCompressor
+from .claim_check import BlobStore, FileBlobStore, RocksDBBlobStore, ClaimCheck
+from .columns import ColumnSchema
 
 _rpc_enabled_methods = set()
 
@@ -72,8 +80,7 @@ def suicide_on_error(method):
         try:
             return method(self, *args, **kwargs)
         except Exception:
-            traceback.print_exc()
-            self.suicide(f'error when executing {method}')
+            self.suicide(f'error when executing {method}', exception=True)
 
     return suicide_on_error_
 
@@ -83,14 +90,29 @@ class Link:
     CONSUMER_POLL_TIMEOUT = 0.5
     QUEUE_GET_TIMEOUT = 0.5
     INSTANCE_TIMEOUT = 3
+    INSTANCE_HEARTBEAT_TIMEOUT = 75
+    MAX_CONCURRENT_INSTANCE_CHECKS = 32
+    # Deadline of the whole shutdown
     SUICIDE_TIMEOUT = 10
 
     WAIT_INTERVAL = 0.5
     RPC_REQUEST_MONITOR_INTERVAL = 0.5
+    RPC_REQUEST_TIMEOUT = 30
+    RPC_REQUEST_EXPIRY_INTERVAL = 1
     CHECK_INSTANCES_INTERVAL = 5
     REPORT_EXISTENCE_INTERVAL = 60
     COMMIT_MESSAGE_INTERVAL = 5
-    LOOP_CHECK_STOP_INTERVAL = 1
+    STATE_FLUSH_INTERVAL = 5
+    STATE_PURGE_INTERVAL = 3600
+    SPILL_STATS_INTERVAL = 10
+    SPILL_DRAIN_RATIO = 0.5
+    SEND_BATCH_SIZE = 1000
+    DICTIONARIES_TOPIC = 'catenae_dictionaries'
+    DICTIONARY_HEADER = 'catenae-zstd-dict'
+    DICTIONARY_FETCH_TIMEOUT = 30
+    DEFAULT_COMPRESSION_CODEC = 'snappy'
+    BLOB_PURGE_INTERVAL = 3600
+    MAX_GENERATOR_BACKLOG = 10000
 
     MAX_COMMIT_ATTEMPTS = 5
 
@@ -103,14 +125,40 @@ class Link:
                  uid_consumer_group=False,
                  num_rpc_threads=1,
                  num_main_threads=1,
+                 max_main_threads=None,
                  input_topics=None,
                  output_topics=None,
                  kafka_endpoint=None,
                  consumer_group=None,
                  consumer_timeout=300,
                  aerospike_endpoint=None,
+                 aerospike_coalesce_window=None,
                  mongodb_endpoint=None,
-                 rocksdb_path=None):
+                 rocksdb_path=None,
+                 state_cache_size=10000,
+                 state_ttl=None,
+                 max_in_flight_messages=10000,
+                 max_in_flight_bytes=268435456,
+                 spill_path=None,
+                 spill_threshold=67108864,
+                 compression_codecs=None,
+                 dictionary_topics=None,
+                 blob_store=None,
+                 claim_check_threshold=921600,
+                 claim_check_ttl=604800,
+                 schema=None,
+                 column_format='numpy',
+                 column_batch_size=1000,
+                 column_batch_timeout=0.1,
+                 columnar_output=False,
+                 fused=False,
+                 exactly_once=False,
+                 transaction_size=1000,
+                 transaction_timeout=0.1,
+                 rate_limit=None,
+                 topic_rate_limits=None,
+                 key_rate_limit=None,
+                 adaptive_polling=False):
 
         # Preserve the id if the container restarts
         if 'CATENAE_DOCKER' in environ \
@@ -128,10 +176,15 @@ class Link:
 
         self._started = False
         self._stopped = False
+        self._stopped_on_error = False
+        self._stop_event = Event()
+        self._shutdown_stats = dict()
         self._input_topics_lock = Lock()
-        self._rpc_lock = Lock()
+        # Transforms hold it in shared mode, RPC methods exclusively
+        self._rpc_lock = SharedLock()
         self._start_stop_lock = Lock()
         self._instances_lock = Lock()
+        self._connectors_lock = RLock()
 
         # RPC topics
         self._rpc_instance_topic = f'catenae_rpc_{self._uid}'
@@ -140,13 +193,38 @@ class Link:
         self._rpc_topics = [
             self._rpc_instance_topic, self._rpc_group_topic, self._rpc_broadcast_topic
         ]
+        # Shared by the consumer thread (fused / exactly-once) and the input handler
         self._known_message_ids = CircularOrderedSet(50)
+        self._known_message_ids_lock = Lock()
+        self._rpc_requests_lock = Lock()
+        self._pending_rpc_requests = dict()
+        self._coalesced_rpc_requests = dict()
+
+        # Set when the link is a stage of a Chain
+        self._chain = None
+        self._downstream = None
+
+        # Shared-memory channels instead of Kafka, set by a Topology
+        self._channels = None
 
         self._load_args()
+        self._set_transaction_properties(exactly_once, transaction_size, transaction_timeout)
+        synchronous = synchronous or self._exactly_once
         self._set_execution_opts(input_mode, exp_window_size, synchronous, sequential,
-                                 num_rpc_threads, num_main_threads, input_topics, output_topics,
-                                 kafka_endpoint, consumer_timeout)
-        self._set_connectors_properties(aerospike_endpoint, mongodb_endpoint, rocksdb_path)
+                                 num_rpc_threads, num_main_threads, max_main_threads, input_topics,
+                                 output_topics, kafka_endpoint, consumer_timeout)
+        self._set_connectors_properties(aerospike_endpoint, aerospike_coalesce_window,
+                                        mongodb_endpoint, rocksdb_path)
+        self._set_state_properties(state_cache_size, state_ttl)
+        self._set_backpressure_properties(max_in_flight_messages, max_in_flight_bytes)
+        self._set_rate_limit_properties(rate_limit, topic_rate_limits, key_rate_limit)
+        self._set_spill_properties(spill_path, spill_threshold)
+        self._set_compression_properties(compression_codecs, dictionary_topics)
+        self._set_claim_check_properties(blob_store, claim_check_threshold, claim_check_ttl)
+        self._set_columnar_properties(schema, column_format, column_batch_size,
+                                      column_batch_timeout, columnar_output)
+        self._set_fused_properties(fused)
+        self._set_polling_properties(adaptive_polling)
         self._set_consumer_group(consumer_group, uid_consumer_group)
         self._set_jsonrpc_props()
 
@@ -158,13 +236,21 @@ class Link:
         self._instances = {'by_uid': dict(), 'by_group': dict()}
         self._known_instances = dict()
         self._safe_stop_threads = list()
+        self._scheduler = Scheduler(self)
+        self._buffers = list()
+        self._caches = dict()
 
-    def _set_connectors_properties(self, aerospike_endpoint, mongodb_endpoint, rocksdb_path):
+    def _set_connectors_properties(self, aerospike_endpoint, aerospike_coalesce_window,
+                                   mongodb_endpoint, rocksdb_path):
         self._set_aerospike_properties(aerospike_endpoint)
         if hasattr(self, '_aerospike_host'):
             self.logger.log(f'aerospike_host: {self._aerospike_host}')
         if hasattr(self, '_aerospike_port'):
             self.logger.log(f'aerospike_port: {self._aerospike_port}')
+        if not hasattr(self, '_aerospike_coalesce_window'):
+            self._aerospike_coalesce_window = aerospike_coalesce_window
+        if self._aerospike_coalesce_window:
+            self.logger.log(f'aerospike_coalesce_window: {self._aerospike_coalesce_window}')
 
         self._set_mongodb_properties(mongodb_endpoint)
         if hasattr(self, '_mongodb_host'):
@@ -176,9 +262,167 @@ class Link:
         if hasattr(self, '_rocksdb_path'):
             self.logger.log(f'rocksdb_path: {self._rocksdb_path}')
 
+    def _set_state_properties(self, state_cache_size, state_ttl):
+        if not hasattr(self, '_state_cache_size'):
+            self._state_cache_size = state_cache_size
+        if not hasattr(self, '_state_ttl'):
+            self._state_ttl = state_ttl
+        if hasattr(self, '_rocksdb_path'):
+            self.logger.log(f'state_cache_size: {self._state_cache_size}')
+            self.logger.log(f'state_ttl: {self._state_ttl}')
+
+    def _set_backpressure_properties(self, max_in_flight_messages, max_in_flight_bytes):
+        if not hasattr(self, '_max_in_flight_messages'):
+            self._max_in_flight_messages = max_in_flight_messages
+        self.logger.log(f'max_in_flight_messages: {self._max_in_flight_messages}')
+
+        if not hasattr(self, '_max_in_flight_bytes'):
+            self._max_in_flight_bytes = max_in_flight_bytes
+        self.logger.log(f'max_in_flight_bytes: {self._max_in_flight_bytes}')
+
+        # Consumed messages until their outputs are produced
+        self._in_flight = InFlightLimiter(self._max_in_flight_messages, self._max_in_flight_bytes)
+
+    def _set_rate_limit_properties(self, rate_limit, topic_rate_limits, key_rate_limit):
+        # Messages per second or (rate, burst) tuples
+        if not hasattr(self, '_rate_limit'):
+            self._rate_limit = rate_limit
+        if not hasattr(self, '_topic_rate_limits'):
+            self._topic_rate_limits = topic_rate_limits
+        if not hasattr(self, '_key_rate_limit'):
+            self._key_rate_limit = key_rate_limit
+
+        self._rate_limiter = RateLimiter(self._rate_limit, self._topic_rate_limits,
+                                         self._key_rate_limit)
+        if self._rate_limiter.enabled:
+            self.logger.log(f'rate_limit: {self._rate_limit}')
+            self.logger.log(f'topic_rate_limits: {self._topic_rate_limits}')
+            self.logger.log(f'key_rate_limit: {self._key_rate_limit}')
+
+    def _set_spill_properties(self, spill_path, spill_threshold):
+        if not hasattr(self, '_spill_path'):
+            self._spill_path = spill_path
+        if not hasattr(self, '_spill_threshold'):
+            self._spill_threshold = spill_threshold
+        if self._spill_path:
+            self.logger.log(f'spill_path: {self._spill_path}')
+            self.logger.log(f'spill_threshold: {self._spill_threshold}')
+
+        self._spill_buffer = None
+        self._spill_stats = dict()
+        # Bytes produced asynchronously whose delivery is not confirmed yet
+        self._pending_output_bytes = 0
+        self._pending_output_lock = Lock()
+
+    def _set_compression_properties(self, compression_codecs, dictionary_topics):
+        if not hasattr(self, '_compression_codecs'):
+            if compression_codecs is None:
+                compression_codecs = dict()
+            self._compression_codecs = compression_codecs
+        if self._compression_codecs:
+            self.logger.log(f'compression_codecs: {self._compression_codecs}')
+            # All the output goes through the single transactional producer
+            if self._exactly_once:
+                self.logger.log(
+                    'compression_codecs ignored with exactly_once, '
+                    f'{Link.DEFAULT_COMPRESSION_CODEC} is used for every topic',
+                    level='warn')
+
+        if not hasattr(self, '_dictionary_topics'):
+            if dictionary_topics is None:
+                dictionary_topics = []
+            self._dictionary_topics = dictionary_topics
+        if self._dictionary_topics:
+            self.logger.log(f'dictionary_topics: {self._dictionary_topics}')
+
+        # Producers by (codec, synchronous)
+        self._producers = dict()
+        self._producers_lock = Lock()
+        self._dictionaries = DictionaryCompressor()
+        self._dictionaries_producer = None
+        self._dictionaries_lock = Lock()
+
+    def _set_claim_check_properties(self, blob_store, claim_check_threshold, claim_check_ttl):
+        # A BlobStore, 'rocksdb' or the path of a FileBlobStore
+        if not hasattr(self, '_blob_store_option'):
+            self._blob_store_option = blob_store
+        if not hasattr(self, '_claim_check_threshold'):
+            self._claim_check_threshold = claim_check_threshold
+        if not hasattr(self, '_claim_check_ttl'):
+            self._claim_check_ttl = claim_check_ttl
+        if self._blob_store_option is not None:
+            self.logger.log(f'blob_store: {self._blob_store_option}')
+            self.logger.log(f'claim_check_threshold: {self._claim_check_threshold}')
+            self.logger.log(f'claim_check_ttl: {self._claim_check_ttl}')
+
+    def _set_columnar_properties(self, schema, column_format, column_batch_size,
+                                 column_batch_timeout, columnar_output):
+        self._column_schema = None
+        if schema is not None:
+            self._column_schema = ColumnSchema(schema, column_format)
+            self.logger.log(f'schema: {self._column_schema.fields}')
+            self.logger.log(f'column_format: {column_format}')
+
+        if not hasattr(self, '_column_batch_size'):
+            self._column_batch_size = column_batch_size
+        self._column_batch_timeout = column_batch_timeout
+        self._columnar_output = columnar_output
+        if self._column_schema is not None:
+            self.logger.log(f'column_batch_size: {self._column_batch_size}')
+            self.logger.log(f'column_batch_timeout: {self._column_batch_timeout}')
+            self.logger.log(f'columnar_output: {self._columnar_output}')
+
+        # Messages and callbacks of the batch being gathered by the input handler,
+        # decoded by the transform threads
+        self._column_messages = []
+        self._column_callbacks = []
+        self._column_batch_start = None
+
+    def _set_fused_properties(self, fused):
+        # Opt-in: sequential links poll, decode, transform and produce in the consumer thread
+        if not hasattr(self, '_fused'):
+            self._fused = fused
+        # Transactions are managed by the consumer thread
+        if self._exactly_once:
+            self._fused = True
+        self._fused = self._fused and self._sequential and not self._is_columnar()
+        self.logger.log(f'fused: {self._fused}')
+
+    def _set_polling_properties(self, adaptive_polling):
+        # Poll and queue timeouts from the inter-arrival times instead of the fixed ones
+        if not hasattr(self, '_adaptive_polling'):
+            self._adaptive_polling = adaptive_polling
+        self.logger.log(f'adaptive_polling: {self._adaptive_polling}')
+
+        # By polling thread. Queues can be interrupted, so they wait indefinitely when idle.
+        self._main_poll_timeout = AdaptiveTimeout(Link.CONSUMER_POLL_TIMEOUT)
+        self._input_timeout = AdaptiveTimeout()
+        self._output_timeout = AdaptiveTimeout()
+        self._input_topics_event = Event()
+
+    def _set_transaction_properties(self, exactly_once, transaction_size, transaction_timeout):
+        if not hasattr(self, '_exactly_once'):
+            self._exactly_once = exactly_once
+        if not hasattr(self, '_transaction_size'):
+            self._transaction_size = transaction_size
+        self._transaction_timeout = transaction_timeout
+        if self._exactly_once:
+            self.logger.log('exactly_once: True')
+            self.logger.log(f'transaction_size: {self._transaction_size}')
+            self.logger.log(f'transaction_timeout: {self._transaction_timeout}')
+
+        # Output and offsets of the open transaction. Only the consumed messages are
+        # counted towards transaction_size, not the produced ones.
+        self._transaction_lock = RLock()
+        self._transaction_open = False
+        self._transaction_start = None
+        self._transaction_messages = 0
+        # Next offset by (topic, partition), only of the messages fully processed
+        self._transaction_offsets = dict()
+
     def _set_execution_opts(self, input_mode, exp_window_size, synchronous, sequential,
-                            num_rpc_threads, num_main_threads, input_topics, output_topics,
-                            kafka_endpoint, consumer_timeout):
+                            num_rpc_threads, num_main_threads, max_main_threads, input_topics,
+                            output_topics, kafka_endpoint, consumer_timeout):
 
         if not hasattr(self, '_input_mode'):
             self._input_mode = input_mode
@@ -216,14 +460,28 @@ class Link:
         if hasattr(self, '_num_main_threads'):
             num_main_threads = self._num_main_threads
 
+        if hasattr(self, '_max_main_threads'):
+            max_main_threads = self._max_main_threads
+
+        # Transforms may mutate the state of the link without locks, so they only run
+        # concurrently if max_main_threads is set explicitly
+        self._concurrent_transforms = max_main_threads is not None \
+            and not (synchronous or sequential)
+
         if synchronous or sequential:
             self._num_main_threads = 1
+            self._max_main_threads = 1
             self._num_rpc_threads = 1
         else:
             self._num_rpc_threads = num_rpc_threads
             self._num_main_threads = num_main_threads
+            if max_main_threads is None:
+                max_main_threads = num_main_threads
+            self._max_main_threads = max(max_main_threads, num_main_threads)
         self.logger.log(f'num_rpc_threads: {self._num_rpc_threads}')
         self.logger.log(f'num_main_threads: {self._num_main_threads}')
+        self.logger.log(f'max_main_threads: {self._max_main_threads}')
+        self.logger.log(f'concurrent_transforms: {self._concurrent_transforms}')
 
         if not self._input_topics:
             self._input_topics = input_topics
@@ -262,22 +520,57 @@ class Link:
     def uid(self):
         return self._uid
 
+    # Connectors are imported and connected on first use
+
     @property
     def aerospike(self):
-        return self._aerospike
+        with self._connectors_lock:
+            if not hasattr(self, '_aerospike'):
+                self._aerospike = self._get_aerospike_connector()
+            return self._aerospike
 
     @property
     def mongodb(self):
-        return self._mongodb
+        with self._connectors_lock:
+            if not hasattr(self, '_mongodb'):
+                self._mongodb = self._get_mongodb_connector()
+            return self._mongodb
 
     @property
     def rocksdb(self):
-        return self._rocksdb
+        with self._connectors_lock:
+            if not hasattr(self, '_rocksdb'):
+                self._rocksdb = self._get_rocksdb_connector()
+            return self._rocksdb
+
+    @property
+    def blob_store(self):
+        with self._connectors_lock:
+            if not hasattr(self, '_blob_store'):
+                self._blob_store = self._get_blob_store()
+            return self._blob_store
+
+    def _get_blob_store(self):
+        if self._blob_store_option is None or isinstance(self._blob_store_option, BlobStore):
+            return self._blob_store_option
+        if self._blob_store_option == 'rocksdb':
+            return RocksDBBlobStore(self.rocksdb)
+        return FileBlobStore(self._blob_store_option)
+
+    def _purge_blobs(self):
+        self.blob_store.purge_expired()
+
+    @property
+    def state(self):
+        with self._connectors_lock:
+            if not hasattr(self, '_state'):
+                self._state = self._get_state_store()
+            return self._state
 
     @suicide_on_error
     def _loop_task(self, target, args=None, kwargs=None, interval=0, wait=False, level='debug'):
-        if wait:
-            time.sleep(interval)
+        if wait and current_thread().wait(interval):
+            return
 
         if args is None:
             args = []
@@ -290,15 +583,14 @@ class Link:
 
         while not current_thread().will_stop:
             self.logger.log(f'new loop iteration ({target.__name__})', level=level)
-            start_timestamp = utils.get_timestamp()
+            start_time = time.monotonic()
 
             target(*args, **kwargs)
 
-            while not current_thread().will_stop:
-                continue_sleeping = (utils.get_timestamp() - start_timestamp) < interval
-                if not continue_sleeping:
-                    break
-                time.sleep(Link.LOOP_CHECK_STOP_INTERVAL)
+            # Woken up as soon as the thread is stopped
+            remaining = interval - (time.monotonic() - start_time)
+            if remaining > 0 and current_thread().wait(remaining):
+                break
 
     def _setup_signals_handler(self):
         for signal_name in ['SIGINT', 'SIGTERM', 'SIGQUIT']:
@@ -314,52 +606,58 @@ class Link:
 
     @suicide_on_error
     def _check_instances(self):
+        import eventlet
+
         with self._instances_lock:
             known_instances = dict(self._known_instances)
 
-        to_add = []
-        to_remove = []
-        for uid, properties in known_instances.items():
-            self.logger.log(f"checking instance availability for {uid}", level='debug')
-
-            group = properties['group']
-            host = properties['host']
-            port = properties['port']
-            scheme = properties['scheme']
-
-            if self._is_endpoint_available(host, port, scheme):
-                to_add.append((uid, group, host, port, scheme))
-            else:
-                to_remove.append((uid, group))
-
-        for instance in to_remove:
-            self._delete_from_known_instances(*instance)
+        # Only the instances without a recent heartbeat are probed
+        now = utils.get_timestamp()
+        stale_uids = [
+            uid for uid, properties in known_instances.items()
+            if now - properties['last_seen'] > Link.INSTANCE_HEARTBEAT_TIMEOUT
+        ]
 
-        for instance in to_add:
-            self._add_to_known_instances(*instance)
+        available = {uid: True for uid in known_instances}
+        if stale_uids:
+            pool = eventlet.GreenPool(min(len(stale_uids), Link.MAX_CONCURRENT_INSTANCE_CHECKS))
+            stale_properties = [known_instances[uid] for uid in stale_uids]
+            results = pool.imap(self._check_instance, stale_uids, stale_properties)
+            available.update(zip(stale_uids, results))
 
-    def _delete_from_known_instances(self, uid, group):
-        with self._instances_lock:
-            if uid in self._instances['by_uid']:
-                del self._instances['by_uid'][uid]
-                self._instances['by_group'][group].remove(uid)
+            # A successful probe counts as a heartbeat
+            with self._instances_lock:
+                for uid in stale_uids:
+                    if available[uid] and uid in self._known_instances:
+                        self._known_instances[uid]['last_seen'] = now
 
-    def _add_to_known_instances(self, uid, group, host, port, scheme):
-        with self._instances_lock:
-            self._instances['by_uid'][uid] = {
-                'host': host,
-                'port': port,
-                'scheme': scheme,
+        instances = {'by_uid': dict(), 'by_group': dict()}
+        for uid, properties in known_instances.items():
+            if not available[uid]:
+                continue
+            group = properties['group']
+            instances['by_uid'][uid] = {
+                'host': properties['host'],
+                'port': properties['port'],
+                'scheme': properties['scheme'],
                 'group': group
             }
-            if not group in self._instances['by_group']:
-                self._instances['by_group'][group] = list()
+            if group not in instances['by_group']:
+                instances['by_group'][group] = list()
+            instances['by_group'][group].append(uid)
+
+        # Readers always get a complete snapshot
+        self._instances = instances
 
-            if uid not in self._instances['by_group'][group]:
-                self._instances['by_group'][group].append(uid)
+    def _check_instance(self, uid, properties):
+        self.logger.log(f"checking instance availability for {uid}", level='debug')
+        return self._is_endpoint_available(properties['host'], properties['port'],
+                                           properties['scheme'])
 
     @suicide_on_error
     def _rpc_request_monitor(self):
+        from .json_rpc import JsonRPC
+
         with self._rpc_lock:
             new_data = self._jsonrpc_conn1.poll()
             if not new_data:
@@ -466,23 +764,26 @@ class Link:
         return False
 
     def _is_endpoint_available(self, host, port, scheme):
+        import eventlet
+        from eventlet.green.urllib import request as green_request
+
         request = {'jsonrpc': '2.0', 'method': 'available', 'id': 0}
         data = bytes(json.dumps(request), 'utf-8')
 
         url = f'{scheme}://{host}:{port}'
 
+        # Green sockets so the timeout is honoured and checks run concurrently
         try:
             with eventlet.Timeout(Link.INSTANCE_TIMEOUT):
-                urlopen(Request(url=url, data=data)).read().decode('utf-8')
+                green_request.urlopen(green_request.Request(url=url,
+                                                            data=data)).read().decode('utf-8')
         except Exception:
             return False
         return True
 
     @property
     def instances(self):
-        with self._instances_lock:
-            instances_known_instances = dict(self._instances)
-            return instances_known_instances
+        return dict(self._instances)
 
     @rpc
     def get_instances(self):
@@ -502,7 +803,8 @@ class Link:
                 'host': host,
                 'port': port,
                 'scheme': scheme,
-                'group': context['group']
+                'group': context['group'],
+                'last_seen': utils.get_timestamp()
             }
 
     def rpc_notify(self, method=None, args=None, kwargs=None, to='broadcast'):
@@ -533,38 +835,207 @@ class Link:
                             topic=topic)
         self.send(electron, synchronous=True)
 
+    def rpc_request(self,
+                    method=None,
+                    args=None,
+                    kwargs=None,
+                    to='broadcast',
+                    timeout=None,
+                    idempotent=False):
+        """
+        Send a Kafka message which will be interpreted as a RPC call by the receiver module.
+        A future is returned, which is resolved with the result of the call when the reply
+        arrives at the instance topic or fails with a TimeoutError after timeout seconds.
+        """
+        return self.rpc_request_many([(method, args, kwargs)],
+                                     to=to,
+                                     timeout=timeout,
+                                     idempotent=idempotent)[0]
+
+    def rpc_request_many(self, calls, to='broadcast', timeout=None, idempotent=False):
+        """
+        Send several RPC requests (method, args, kwargs) with a single Kafka message.
+        If idempotent is set, calls equal to another pending request are coalesced and
+        share its future.
+        """
+        if timeout is None:
+            timeout = Link.RPC_REQUEST_TIMEOUT
+        deadline = utils.get_timestamp_ms() + timeout * 1000
+        to = to.lower()
+
+        # Every call is validated before any of them is registered, so a bad call
+        # does not leave pending futures which are never sent
+        normalized_calls = []
+        for call in calls:
+            method, args, kwargs = (tuple(call) + (None, None))[:3]
+            if not method:
+                raise ValueError
+
+            if args is None:
+                args = []
+
+            if not isinstance(args, list):
+                args = [args]
+
+            if kwargs is None:
+                kwargs = {}
+
+            coalesce_key = None
+            if idempotent:
+                coalesce_key = pickle.dumps((to, method, args, sorted(kwargs.items())),
+                                            protocol=pickle.HIGHEST_PROTOCOL)
+            normalized_calls.append((method, args, kwargs, coalesce_key))
+
+        futures = []
+        requests = []
+        with self._rpc_requests_lock:
+            for method, args, kwargs, coalesce_key in normalized_calls:
+                if coalesce_key in self._coalesced_rpc_requests:
+                    futures.append(self._coalesced_rpc_requests[coalesce_key])
+                    continue
+
+                future = Future()
+                # Pending requests cannot be cancelled
+                future.set_running_or_notify_cancel()
+
+                request_id = utils.get_uid()
+                self._pending_rpc_requests[request_id] = (future, deadline, coalesce_key)
+                if coalesce_key is not None:
+                    self._coalesced_rpc_requests[coalesce_key] = future
+
+                requests.append({
+                    'id': request_id,
+                    'method': method,
+                    'args': args,
+                    'kwargs': kwargs
+                })
+                futures.append(future)
+
+        if requests:
+            electron = Electron(value={
+                'context': {
+                    'group': self._consumer_group,
+                    'uid': self._uid
+                },
+                'reply_to': self._rpc_instance_topic,
+                'requests': requests
+            },
+                                topic=f'catenae_rpc_{to}')
+            self.send(electron, synchronous=False)
+
+        return futures
+
+    def _expire_rpc_requests(self):
+        now = utils.get_timestamp_ms()
+        expired = []
+        with self._rpc_requests_lock:
+            for request_id, (future, deadline, coalesce_key) in list(
+                    self._pending_rpc_requests.items()):
+                if now < deadline:
+                    continue
+                del self._pending_rpc_requests[request_id]
+                self._coalesced_rpc_requests.pop(coalesce_key, None)
+                expired.append(future)
+
+        for future in expired:
+            future.set_exception(errors.TimeoutError('RPC request timed out'))
+
+    def _resolve_rpc_requests(self, responses):
+        resolved = []
+        with self._rpc_requests_lock:
+            for response in responses:
+                # Expired, already answered (e.g., broadcast) or unknown
+                pending = self._pending_rpc_requests.pop(response['id'], None)
+                if pending is None:
+                    continue
+                future, _, coalesce_key = pending
+                self._coalesced_rpc_requests.pop(coalesce_key, None)
+                resolved.append((future, response))
+
+        # Futures are resolved outside the lock since their callbacks may
+        # issue new requests
+        for future, response in resolved:
+            if 'error' in response:
+                future.set_exception(errors.RPCError(response['error']))
+            else:
+                future.set_result(response['result'])
+
+    def _reply_rpc_requests(self, value):
+        context = value['context']
+        self.logger.log(f"RPC request from {context['uid']} ({context['group']})", level='debug')
+
+        responses = []
+        for request in value['requests']:
+            method = request['method']
+            response = {'id': request['id']}
+            try:
+                response['result'] = self._invoke_rpc_method(context, method, request['args'],
+                                                             request['kwargs'])
+            except errors.MethodNotFoundError:
+                self.logger.log(f'method {method} cannot be called', level='error')
+                response['error'] = f'method {method} cannot be called'
+            except Exception:
+                self.logger.log(f'error when invoking {method} remotely', level='exception')
+                response['error'] = f'error when invoking {method} remotely'
+            responses.append(response)
+
+        electron = Electron(value={
+            'context': {
+                'group': self._consumer_group,
+                'uid': self._uid
+            },
+            'responses': responses
+        },
+                            topic=value['reply_to'])
+        self.send(electron, synchronous=False)
+
+    def _invoke_rpc_method(self, context, method, args, kwargs):
+        if not self._is_method_rpc_enabled(method):
+            raise errors.MethodNotFoundError
+
+        with self._rpc_lock:
+            return getattr(self, method)(*([context] + args), **kwargs)
+
     @suicide_on_error
     def _rpc_notify(self, electron, commit_callback):
-        method = electron.value['method']
-        if not self._is_method_rpc_enabled(method):
-            self.logger.log(f'method {method} cannot be called', level='error')
-            return
+        if 'responses' in electron.value:
+            self._resolve_rpc_requests(electron.value['responses'])
 
-        if not 'method' in electron.value:
-            self.logger.log(f'invalid RPC invocation: {electron.value}', level='error')
-            return
+        elif 'requests' in electron.value:
+            self._reply_rpc_requests(electron.value)
 
-        try:
-            context = electron.value['context']
-            args = [context] + electron.value['args']
-            kwargs = electron.value['kwargs']
-            self.logger.log(f"RPC invocation from {context['uid']} ({context['group']})",
-                            level='debug')
-            with self._rpc_lock:
-                getattr(self, electron.value['method'])(*args, **kwargs)
+        elif 'method' in electron.value:
+            method = electron.value['method']
+            try:
+                context = electron.value['context']
+                self.logger.log(f"RPC invocation from {context['uid']} ({context['group']})",
+                                level='debug')
+                self._invoke_rpc_method(context, method, electron.value['args'],
+                                        electron.value['kwargs'])
 
-        except Exception:
-            self.logger.log(f'error when invoking {method} remotely', level='exception')
+            except errors.MethodNotFoundError:
+                self.logger.log(f'method {method} cannot be called', level='error')
+
+            except Exception:
+                self.logger.log(f'error when invoking {method} remotely', level='exception')
+
+        else:
+            self.logger.log(f'invalid RPC invocation: {electron.value}', level='error')
 
         commit_callback.execute()
 
     def suicide(self, message=None, exception=False):
+        if self._chain is not None:
+            self._chain.suicide(message, exception)
+
         if message is None:
             message = '[SUICIDE]'
         else:
             message = f'[SUICIDE] {message}'
 
         if exception:
+            # Open transactions are aborted instead of commited
+            self._stopped_on_error = True
             self.logger.log(message, level='exception')
         else:
             self.logger.log(message, level='warn')
@@ -586,29 +1057,8 @@ class Link:
         except Exception:
             self.logger.log('error when executing finish()', level='exception')
 
-        while not self._started:
-            time.sleep(Link.WAIT_INTERVAL)
-
-        for thread in self._safe_stop_threads:
-            thread.stop()
-
-        if self._kafka_endpoint:
-            if hasattr(self, '_producer_thread'):
-                self._producer_thread.stop()
-            if hasattr(self, '_input_handler_thread'):
-                self._input_handler_thread.stop()
-            if hasattr(self, '_consumer_rpc_thread'):
-                self._consumer_rpc_thread.stop()
-            if hasattr(self, '_consumer_main_thread'):
-                self._consumer_main_thread.stop()
-
-            if hasattr(self, '_transform_rpc_executor'):
-                for thread in self._transform_rpc_executor.threads:
-                    thread.stop()
-            if hasattr(self, '_transform_main_executor'):
-                for thread in self._transform_main_executor.threads:
-                    thread.stop()
-
+        # The shutdown is done by _join_tasks(), once the link has started
+        self._stop_event.set()
         self.logger.log('suicide initialized.')
 
     def loop(self,
@@ -618,7 +1068,29 @@ class Link:
              interval=0,
              wait=False,
              level='debug',
-             safe_stop=True):
+             safe_stop=True,
+             fixed_rate=False,
+             jitter=0):
+        """
+        Execute the target every interval seconds, fractions included. Loops with an
+        interval are executed by the scheduler of the link (see Scheduler) and are
+        stopped with it; jitter is the maximum random delay of every execution. They
+        return a ScheduledTask, which can be stopped and joined as a thread.
+
+        Loops without interval, and those which must keep running while the link
+        stops (safe_stop=False), run the target in a thread of their own, which is
+        returned.
+        """
+        if interval and safe_stop:
+            return self._scheduler.schedule(target,
+                                            args=args,
+                                            kwargs=kwargs,
+                                            interval=interval,
+                                            wait=wait,
+                                            fixed_rate=fixed_rate,
+                                            jitter=jitter,
+                                            level=level)
+
         loop_task_kwargs = {
             'target': target,
             'args': args,
@@ -634,6 +1106,138 @@ class Link:
         thread.start()
         return thread
 
+    def buffered(self,
+                 connector,
+                 max_documents=1000,
+                 max_bytes=16777216,
+                 interval=1,
+                 on_error=None):
+        """
+        Write-behind wrapper for the MongoDB connector. Pending writes are also
+        flushed before every commit, every interval seconds and when the link stops.
+        """
+        from .buffers import BufferedMongodbConnector
+
+        buffered_connector = BufferedMongodbConnector(connector,
+                                                      max_documents=max_documents,
+                                                      max_bytes=max_bytes,
+                                                      on_error=on_error)
+        self._buffers.append(buffered_connector)
+        if not self._is_commit_bound():
+            self.loop(self._flush_buffer, args=[buffered_connector], interval=interval, wait=True)
+        return buffered_connector
+
+    def windowed(self,
+                 window,
+                 aggregate,
+                 on_close,
+                 allowed_lateness=0,
+                 max_open_windows=None,
+                 idle_timeout=None,
+                 sources=None,
+                 interval=1):
+        """
+        Windowed aggregation whose watermark is also advanced every interval seconds,
+        so windows are closed without new records if the sources are idle. Windows
+        closed by the loop are passed to on_close(results).
+        """
+        from .windows import WindowedAggregation
+
+        aggregation = WindowedAggregation(window,
+                                          aggregate,
+                                          allowed_lateness=allowed_lateness,
+                                          max_open_windows=max_open_windows,
+                                          idle_timeout=idle_timeout,
+                                          sources=sources)
+        self.loop(self._advance_window, args=[aggregation, on_close], interval=interval,
+                  wait=True)
+        return aggregation
+
+    def _advance_window(self, aggregation, on_close):
+        results = aggregation.advance()
+        if results:
+            on_close(results)
+
+    def cached(self,
+               connector,
+               ttl=60,
+               max_items=10000,
+               max_bytes=None,
+               negative_ttl=None,
+               write_through=False,
+               name=None,
+               get_key=None,
+               get_write=None):
+        """
+        Read-through cache for the lookups of a connector (see CachedConnector). Its
+        counters are available through the cache_stats RPC method and it can be
+        invalidated remotely with rpc_notify('invalidate_cache', kwargs={'name': name}).
+        """
+        if name is None:
+            name = f'{connector.__class__.__name__.lower()}_{len(self._caches)}'
+        cached_connector = CachedConnector(connector,
+                                           ttl=ttl,
+                                           max_items=max_items,
+                                           max_bytes=max_bytes,
+                                           negative_ttl=negative_ttl,
+                                           write_through=write_through,
+                                           get_key=get_key,
+                                           get_write=get_write)
+        self._caches[name] = cached_connector
+        return cached_connector
+
+    @rpc
+    def cache_stats(self, context=None):
+        return {name: cache.stats for name, cache in self._caches.items()}
+
+    @rpc
+    def invalidate_cache(self, context=None, name=None, keys=None):
+        for cache_name, cache in self._caches.items():
+            if name is None or name == cache_name:
+                cache.invalidate(keys)
+
+    @rpc
+    def loop_stats(self, context=None):
+        return self._scheduler.stats
+
+    @rpc
+    def spill_stats(self, context=None):
+        return dict(self._spill_stats)
+
+    def _update_spill_stats(self):
+        stats = self._spill_buffer.stats
+        stats['timestamp'] = utils.get_timestamp()
+        stats['pending_output_bytes'] = self._pending_output_bytes
+
+        previous_stats = self._spill_stats
+        if previous_stats:
+            elapsed = max(stats['timestamp'] - previous_stats['timestamp'], 1)
+            stats['spill_rate'] = (stats['spilled'] - previous_stats['spilled']) / elapsed
+            stats['drain_rate'] = (stats['drained'] - previous_stats['drained']) / elapsed
+        self._spill_stats = stats
+
+        if stats['records']:
+            self.logger.log(f'spill buffer: {stats}', level='warn')
+
+    def _is_commit_bound(self):
+        """ In synchronous mode buffers are only flushed along with the commits. """
+        return self._synchronous and bool(self._input_topics)
+
+    def _flush_buffer(self, buffer):
+        try:
+            buffer.flush()
+        except Exception:
+            # The writes stay buffered until the next flush
+            self.logger.log('MongoDB error when flushing the buffered writes', level='exception')
+
+    def _flush_buffers(self):
+        try:
+            for buffer in self._buffers:
+                buffer.flush()
+        except Exception:
+            # The messages are not committed, so they are transformed again after the restart
+            self.suicide('MongoDB error when flushing the buffered writes', exception=True)
+
     def launch_thread(self, target, args=None, kwargs=None, safe_stop=False):
         thread = Thread(target, args=args, kwargs=kwargs)
         if safe_stop:
@@ -650,30 +1254,43 @@ class Link:
     @suicide_on_error
     def _kafka_producer(self):
         while not current_thread().will_stop:
+            if self._spill_buffer is not None:
+                self._drain_spill()
+
             try:
-                electron = self._output_messages.get(timeout=Link.QUEUE_GET_TIMEOUT, block=False)
+                electron = Link._get_from_queue(self._output_messages, self._get_output_timeout())
             except errors.EmptyError:
+                self._output_timeout.record(False)
                 continue
 
+            self._output_timeout.record(True)
             self._produce(electron)
 
-    def _produce(self, electron, synchronous=None):
+    def _get_output_timeout(self):
+        if not self._adaptive_polling:
+            return Link.QUEUE_GET_TIMEOUT
+        timeout = self._output_timeout.get()
+        # The spilled messages are drained between gets
+        if self._spill_buffer is not None \
+        and (timeout is None or timeout > Link.QUEUE_GET_TIMEOUT):
+            return Link.QUEUE_GET_TIMEOUT
+        return timeout
+
+    @staticmethod
+    def _get_from_queue(queue, timeout):
+        """ Without waiting if timeout is 0, until an item arrives or the queue is
+        interrupted if None. """
+        if timeout == 0:
+            return queue.get(block=False)
+        return queue.get(timeout=timeout)
+
+    def _produce(self, electron, synchronous=None, flush=True):
         # All the queue items of the _output_messages must be individual
         # instances of Electron
         if not isinstance(electron, Electron):
             raise ValueError
 
-        # The key is enconded for its use as partition key
-        partition_key = None
-        if electron.key:
-            if isinstance(electron.key, str):
-                partition_key = electron.key.encode('utf-8')
-            else:
-                partition_key = pickle.dumps(electron.key, protocol=pickle.HIGHEST_PROTOCOL)
-        # Same partition key for the current instance if sequential mode
-        # is enabled so consumer can get messages in order
-        elif self._sequential:
-            partition_key = b'0'
+        partition_key = self._get_partition_key(electron)
 
         # If the destiny topic is not specified, the first is used
         if not electron.topic:
@@ -685,27 +1302,52 @@ class Link:
         if electron.unpack_if_string and isinstance(electron.value, str):
             serialized_electron = electron.value
         else:
-            serialized_electron = pickle.dumps(electron.get_sendable(),
-                                               protocol=pickle.HIGHEST_PROTOCOL)
+            serialized_electron = serialization.dumps(electron.get_sendable())
+
+        # Only a reference is produced for big values
+        if self._blob_store_option is not None \
+        and len(serialized_electron) > self._claim_check_threshold:
+            serialized_electron = self._get_claim_check(electron, serialized_electron)
+
+        headers = None
+        if electron.topic in self._dictionary_topics:
+            if isinstance(serialized_electron, str):
+                serialized_electron = serialized_electron.encode('utf-8')
+            dictionary_id, serialized_electron = self._dictionaries.compress(
+                electron.topic, serialized_electron)
+            if dictionary_id is not None:
+                headers = [(Link.DICTIONARY_HEADER, str(dictionary_id).encode('utf-8'))]
 
         if synchronous is None:
             synchronous = self._synchronous
 
-        if synchronous:
-            producer = self._sync_producer
-        else:
-            producer = self._async_producer
+        producer = self._get_producer(electron.topic, synchronous)
 
         try:
-            # If partition_key == None, the partition.assignment.strategy
-            # is used to distribute the messages
-            producer.produce(topic=electron.topic, key=partition_key, value=serialized_electron)
-
-            if synchronous:
-                # Wait for all messages in the Producer queue to be delivered.
-                producer.flush()
-            else:
+            if self._exactly_once:
+                # Flushed when the transaction is commited
+                with self._transaction_lock:
+                    self._begin_transaction()
+                    producer.produce(topic=electron.topic,
+                                     key=partition_key,
+                                     value=serialized_electron,
+                                     headers=headers)
                 producer.poll(0)
+            elif not synchronous and self._spill_buffer is not None:
+                self._produce_or_spill(electron.topic, partition_key, serialized_electron, headers)
+            else:
+                # If partition_key == None, the partition.assignment.strategy
+                # is used to distribute the messages
+                producer.produce(topic=electron.topic,
+                                 key=partition_key,
+                                 value=serialized_electron,
+                                 headers=headers)
+
+                if synchronous and flush:
+                    # Wait for all messages in the Producer queue to be delivered.
+                    producer.flush()
+                else:
+                    producer.poll(0)
 
             self.logger.log('electron produced', level='debug')
 
@@ -715,10 +1357,136 @@ class Link:
         except Exception:
             self.suicide('Kafka producer error', exception=True)
 
+    def _get_partition_key(self, electron):
+        # The key is enconded for its use as partition key
+        if electron.key:
+            if isinstance(electron.key, str):
+                return electron.key.encode('utf-8')
+            return pickle.dumps(electron.key, protocol=pickle.HIGHEST_PROTOCOL)
+        # Same partition key for the current instance if sequential mode
+        # is enabled so consumer can get messages in order
+        if self._sequential:
+            return b'0'
+        return None
+
+    def _throttle(self, electron):
+        """ Called by the sending thread before the electron is queued, so a throttled
+        topic or key does not hold back the messages of the others. """
+        if not self._rate_limiter.enabled:
+            return
+
+        topic = electron.topic
+        if not topic and self._output_topics:
+            topic = self._output_topics[0]
+        # RPC calls and responses are never throttled
+        if not topic or topic.startswith('catenae_rpc_'):
+            return
+
+        key = self._get_partition_key(electron) if electron.key else None
+        delay = self._rate_limiter.acquire(topic, key)
+        if delay > 0:
+            self.logger.log(f'throttled for {delay:.3f}s ({topic})', level='debug')
+            start_time = time.monotonic()
+            # Messages are not throttled anymore if the link is stopping
+            custom_threading.wait(delay)
+            self._rate_limiter.record_throttle(time.monotonic() - start_time)
+
+    @rpc
+    def set_rate_limit(self, context=None, rate=None, burst=None, topic=None, per_key=False):
+        """ Messages per second of the link, a topic or every key; None removes it. """
+        self._rate_limiter.set_limit(rate, burst, topic, per_key)
+        self.logger.log(f'rate limit updated: {self._rate_limiter.stats}')
+
+    @rpc
+    def rate_limit_stats(self, context=None):
+        return self._rate_limiter.stats
+
+    def _get_claim_check(self, electron, serialized_electron):
+        # The electron is already serialized, it is stored as is
+        if isinstance(serialized_electron, str):
+            serialized_electron = serialization.dumps(electron.get_sendable())
+        claim_check = ClaimCheck(size=len(serialized_electron))
+        self.blob_store.put(claim_check.blob_id, serialized_electron, ttl=self._claim_check_ttl)
+        self.logger.log(
+            f'value stored as blob {claim_check.blob_id} ({len(serialized_electron)} bytes)',
+            level='debug')
+
+        sendable = electron.get_sendable()
+        sendable.value = claim_check
+        return serialization.dumps(sendable)
+
+    def _produce_or_spill(self, topic, key, value, headers=None):
+        # Older messages are still on disk, keep the order
+        if len(self._spill_buffer) or self._pending_output_bytes >= self._spill_threshold:
+            self._spill(topic, key, value, headers)
+            return
+
+        producer = self._get_producer(topic, False)
+        try:
+            producer.produce(topic=topic,
+                             key=key,
+                             value=value,
+                             headers=headers,
+                             on_delivery=self._on_spillable_delivery)
+        except BufferError:
+            # The local queue of the producer is full
+            self._spill(topic, key, value, headers)
+            return
+
+        with self._pending_output_lock:
+            self._pending_output_bytes += len(value)
+        producer.poll(0)
+
+    def _on_spillable_delivery(self, error, message):
+        with self._pending_output_lock:
+            self._pending_output_bytes -= len(message.value())
+
+        # Failed deliveries (e.g., message timeouts) are retried after the spilled ones
+        if error is not None:
+            self.logger.log(f'delivery failed, spilling the message: {error}', level='debug')
+            self._spill(message.topic(), message.key(), message.value(), message.headers())
+
+    def _spill(self, topic, key, value, headers=None):
+        self._spill_buffer.append(pickle.dumps((topic, key, value, headers),
+                                               protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _poll_async_producers(self):
+        for (_, synchronous), producer in list(self._producers.items()):
+            if not synchronous:
+                producer.poll(0)
+
+    def _drain_spill(self):
+        # Serve delivery callbacks even if there is nothing new to produce
+        self._poll_async_producers()
+
+        while len(self._spill_buffer) \
+        and self._pending_output_bytes < self._spill_threshold * Link.SPILL_DRAIN_RATIO:
+            topic, key, value, headers = pickle.loads(self._spill_buffer.peek())
+            try:
+                self._get_producer(topic, False).produce(topic=topic,
+                                                         key=key,
+                                                         value=value,
+                                                         headers=headers,
+                                                         on_delivery=self._on_spillable_delivery)
+            except BufferError:
+                break
+
+            with self._pending_output_lock:
+                self._pending_output_bytes += len(value)
+            self._spill_buffer.pop()
+
+        self._poll_async_producers()
+
+    def _get_transform_lock(self):
+        """ RPC methods are never executed during a transform. """
+        if self._concurrent_transforms:
+            return self._rpc_lock.shared()
+        return self._rpc_lock
+
     @suicide_on_error
-    def _transform(self, electron, commit_callback):
+    def _transform(self, electron, commit_callback, release_callback=None):
         try:
-            with self._rpc_lock:
+            with self._get_transform_lock():
                 transform_result = self.transform(electron)
             self.logger.log('electron transformed', level='debug')
         except Exception:
@@ -738,12 +1506,70 @@ class Link:
                     else:
                         transform_callback.args = transform_result[2]
 
-        # Transform returns None
-        if electrons is None:
-            if transform_callback:
-                transform_callback.execute()
-            if commit_callback:
-                commit_callback.execute()
+        # Buffered writes are persisted right before the offset is committed
+        buffers_callback = Callback()
+        if commit_callback and self._buffers:
+            buffers_callback.target = self._flush_buffers
+
+        self._send_transformed(
+            electrons, [transform_callback, buffers_callback, commit_callback, release_callback])
+
+    def _get_column_batches(self, messages):
+        batches = []
+        rows = []
+        for message in messages:
+            try:
+                value = self._decode_value(message)
+            except Exception:
+                self.suicide('exception while decoding a message', exception=True)
+
+            # Batches sent by columnar links are transformed as they are
+            if ColumnSchema.is_batch(value):
+                if rows:
+                    batches.append(self._column_schema.to_batch(rows))
+                    rows = []
+                batches.append(self._column_schema.convert(value))
+            else:
+                rows.append(self._column_schema.get_row(value))
+
+        if rows:
+            batches.append(self._column_schema.to_batch(rows))
+        return batches
+
+    @suicide_on_error
+    def _transform_columns(self, messages, callbacks):
+        electrons = []
+        for batch in self._get_column_batches(messages):
+            try:
+                with self._get_transform_lock():
+                    result = self.transform_columns(batch)
+                self.logger.log(f'batch of {len(batch)} rows transformed', level='debug')
+            except Exception:
+                self.suicide('exception during the execution of transform_columns()',
+                             exception=True)
+
+            if result is None or not len(result):
+                continue
+            if self._columnar_output:
+                electrons.append(Electron(value=result))
+            else:
+                electrons += [Electron(value=row) for row in ColumnSchema.to_rows(result)]
+
+        callbacks = [callback for callback in callbacks if callback]
+
+        # Buffered writes are persisted right before the offsets are committed
+        if self._buffers and any(callback.mode == Callback.COMMIT_KAFKA_MESSAGE
+                                 for callback in callbacks):
+            callbacks.insert(0, Callback(self._flush_buffers))
+
+        self._send_transformed(electrons, callbacks)
+
+    def _send_transformed(self, electrons, callbacks):
+        # Transform returns None or an empty list
+        if electrons is None or (isinstance(electrons, list) and not electrons):
+            for callback in callbacks:
+                if callback:
+                    callback.execute()
             return
 
         # Already a list
@@ -761,28 +1587,57 @@ class Link:
             else:
                 electrons = [Electron(value=electrons)]
 
-        # Execute transform_callback only for the last electron
-        if transform_callback:
-            electrons[-1].callbacks.append(transform_callback)
-        if commit_callback:
-            electrons[-1].callbacks.append(commit_callback)
+        # Callbacks are executed only for the last electron
+        for callback in callbacks:
+            if callback:
+                electrons[-1].callbacks.append(callback)
+
+        if self._downstream is not None:
+            self._downstream._receive(electrons)
+            return
 
         for electron in electrons:
+            self._throttle(electron)
             if self._synchronous:
                 self._produce(electron)
             else:
                 self._output_messages.put(electron)
 
+    def _receive(self, electrons):
+        """ Electrons sent by the previous stage of a Chain. """
+        for electron in electrons:
+            # The callbacks of the previous stages are executed with the last ones
+            callbacks = [callback for callback in electron.callbacks if callback]
+            electron.callbacks = []
+            commit_callback = Callback()
+            if callbacks:
+                commit_callback.target = Link._execute_callbacks
+                commit_callback.args = [callbacks]
+
+            electron.previous_topic = electron.topic
+            electron.topic = None
+            self._transform(electron, commit_callback)
+
+    @staticmethod
+    def _execute_callbacks(callbacks):
+        for callback in callbacks:
+            callback.execute()
+
     @suicide_on_error
     def _input_handler(self):
         while not current_thread().will_stop:
             self.logger.log('waiting for a new electron to transform...', level='debug')
 
             try:
-                queue_item = self._input_messages.get(timeout=Link.QUEUE_GET_TIMEOUT, block=False)
+                queue_item = Link._get_from_queue(self._input_messages,
+                                                  self._get_input_timeout())
             except errors.EmptyError:
+                self._input_timeout.record(False)
+                self._flush_column_batch(only_if_expired=True)
                 continue
 
+            self._input_timeout.record(True)
+
             commit_callback = Callback(mode=Callback.COMMIT_KAFKA_MESSAGE)
 
             # Tuple
@@ -797,36 +1652,129 @@ class Link:
             else:
                 message = queue_item
 
+            # Only the messages of the main consumer are accounted as in-flight
+            release_callback = Callback()
+            if message.topic() not in self._rpc_topics:
+                release_callback.target = self._in_flight.release
+                release_callback.args = [Link._get_message_size(message)]
+
             if self._is_message_known(message):
+                if release_callback:
+                    release_callback.execute()
                 continue
 
             self._mark_known_message(message)
             self.logger.log('electron received', level='debug')
 
-            try:
-                electron = Electron(value=message.value().decode('utf-8'))
-            except Exception:
-                electron = pickle.loads(message.value())
-
-            # Add the message timestamp
-            message_timestamp = message.timestamp()[1]
-            electron.timestamp = message_timestamp
+            # Main messages are decoded by the transform threads. With --seq there is
+            # a single one, so the order is preserved.
+            if message.topic() not in self._rpc_topics:
+                if self._is_columnar():
+                    self._add_to_column_batch(message, [commit_callback, release_callback])
+                else:
+                    self._transform_main_executor.submit(
+                        self._decode_and_transform, [message, commit_callback, release_callback])
+                continue
 
-            # Clean the previous topic
-            electron.previous_topic = message.topic()
-            electron.topic = None
+            electron = self._decode(message)
 
-            # The destiny topic will be overwritten if desired in the
-            # transform method (default, first output topic)
-            if electron.previous_topic in self._rpc_topics:
-                # Avoid own RPC calls
-                if electron.value['context']['uid'] == self._uid:
-                    commit_callback.execute()
-                else:
-                    self._transform_rpc_executor.submit(self._rpc_notify,
-                                                        [electron, commit_callback])
+            # Avoid own RPC calls
+            if electron.value['context']['uid'] == self._uid:
+                commit_callback.execute()
             else:
-                self._transform_main_executor.submit(self._transform, [electron, commit_callback])
+                self._transform_rpc_executor.submit(self._rpc_notify, [electron, commit_callback])
+
+    def _loads(self, message):
+        """ The string or the electron sent. """
+        value = message.value()
+        dictionary_id = Link._get_dictionary_id(message)
+        if dictionary_id is not None:
+            if not self._dictionaries.has(dictionary_id):
+                with self._dictionaries_lock:
+                    if not self._dictionaries.has(dictionary_id):
+                        self._fetch_dictionary(dictionary_id)
+            value = self._dictionaries.decompress(dictionary_id, value)
+
+        try:
+            return value.decode('utf-8')
+        except Exception:
+            electron = serialization.loads(value)
+
+        # Claim checks are resolved with the blob store of this link
+        if isinstance(electron._value, ClaimCheck):
+            electron._value.store = self.blob_store
+        return electron
+
+    def _decode_value(self, message):
+        """ Only the value, the electron is not completed (e.g., rows of columnar links). """
+        value = self._loads(message)
+        if isinstance(value, Electron):
+            return value.value
+        return value
+
+    def _decode(self, message):
+        electron = self._loads(message)
+        if not isinstance(electron, Electron):
+            electron = Electron(value=electron)
+
+        # Add the message timestamp
+        message_timestamp = message.timestamp()[1]
+        electron.timestamp = message_timestamp
+        electron.partition = message.partition()
+
+        # Clean the previous topic
+        electron.previous_topic = message.topic()
+
+        # The destiny topic will be overwritten if desired in the
+        # transform method (default, first output topic)
+        electron.topic = None
+        return electron
+
+    @suicide_on_error
+    def _decode_and_transform(self, message, commit_callback, release_callback=None):
+        try:
+            electron = self._decode(message)
+        except Exception:
+            self.suicide('exception while decoding a message', exception=True)
+        self._transform(electron, commit_callback, release_callback)
+
+    def _is_columnar(self):
+        return self._column_schema is not None and self.transform_columns is not None
+
+    def _get_input_timeout(self):
+        if not self._column_messages:
+            if self._adaptive_polling:
+                return self._input_timeout.get()
+            return Link.QUEUE_GET_TIMEOUT
+        elapsed = (utils.get_timestamp_ms() - self._column_batch_start) / 1000
+        return min(max(self._column_batch_timeout - elapsed, 0), Link.QUEUE_GET_TIMEOUT)
+
+    def _add_to_column_batch(self, message, callbacks):
+        if not self._column_messages:
+            self._column_batch_start = utils.get_timestamp_ms()
+        self._column_messages.append(message)
+        self._column_callbacks += callbacks
+        if len(self._column_messages) >= self._column_batch_size:
+            self._flush_column_batch()
+
+    def _flush_column_batch(self, only_if_expired=False):
+        if not self._column_messages:
+            return
+        if only_if_expired and self._get_input_timeout() > 0:
+            return
+        self._transform_main_executor.submit(self._transform_columns,
+                                             [self._column_messages, self._column_callbacks])
+        self._column_messages = []
+        self._column_callbacks = []
+
+    @staticmethod
+    def _get_message_size(message):
+        size = 0
+        if message.key():
+            size += len(message.key())
+        if message.value():
+            size += len(message.value())
+        return size
 
     @staticmethod
     def _get_message_id(message):
@@ -837,7 +1785,9 @@ class Link:
         """ Avoid processing repeated messages. This is not mandatory for RPC 
         calls / synchronous mode"""
         message_id = Link._get_message_id(message)
-        if message_id in self._known_message_ids:
+        with self._known_message_ids_lock:
+            known = message_id in self._known_message_ids
+        if known:
             self.logger.log(f'Received known message (topic_partition_offset): {message_id}',
                             level='debug')
             return True
@@ -845,12 +1795,35 @@ class Link:
 
     def _mark_known_message(self, message):
         message_id = Link._get_message_id(message)
-        self._known_message_ids.add(message_id)
+        with self._known_message_ids_lock:
+            self._known_message_ids.add(message_id)
 
     def _break_consumer_loop(self, subscription):
         return len(subscription) > 1 and self._input_mode != 'parity'
 
+    def _apply_backpressure(self, consumer, paused):
+        """ Pause the assigned partitions while too many messages are in flight.
+        The consumer keeps polling so it stays in the group. Returns the paused
+        partitions, which are paused and resumed only once. """
+        if self._in_flight.throttled:
+            # Partitions assigned during a rebalance are not paused yet
+            unpaused = [partition for partition in consumer.assignment() if partition not in paused]
+            if unpaused:
+                consumer.pause(unpaused)
+                if not paused:
+                    self.logger.log(f'consumer paused, in flight: {self._in_flight.stats}',
+                                    level='warn')
+                paused = paused | set(unpaused)
+            return paused
+
+        if paused:
+            consumer.resume(consumer.assignment())
+            self.logger.log(f'consumer resumed, in flight: {self._in_flight.stats}')
+        return set()
+
     def _commit_kafka_message(self, consumer, message):
+        from confluent_kafka import KafkaError, KafkaException
+
         commited = False
         attempts = 1
         self.logger.log(f'trying to commit a message ({attempts}/{Link.MAX_COMMIT_ATTEMPTS})',
@@ -885,10 +1858,23 @@ class Link:
 
         self.logger.log(f'message commited', level='debug')
 
+    def _is_connected(self):
+        return bool(self._kafka_endpoint) or self._channels is not None
+
+    def _get_consumer(self, properties):
+        if self._channels is not None:
+            return self._channels.get_consumer()
+
+        from confluent_kafka import Consumer
+        return Consumer(properties)
+
     @suicide_on_error
     def _kafka_rpc_consumer(self):
+        from confluent_kafka import KafkaError
+
         properties = dict(self._kafka_consumer_synchronous_properties)
-        consumer = Consumer(properties)
+        consumer = self._get_consumer(properties)
+        self._rpc_consumer = consumer
         self.logger.log(f'[RPC] consumer properties: {utils.dump_dict_pretty(properties)}',
                         level='debug')
         subscription = list(self._rpc_topics)
@@ -917,19 +1903,31 @@ class Link:
 
     @suicide_on_error
     def _kafka_main_consumer(self):
+        from confluent_kafka import KafkaError
+
         if self._synchronous:
             properties = dict(self._kafka_consumer_synchronous_properties)
         else:
             properties = dict(self._kafka_consumer_common_properties)
 
-        consumer = Consumer(properties)
+        consumer = self._get_consumer(properties)
+        self._main_consumer = consumer
         self.logger.log(f'[MAIN] consumer properties: {utils.dump_dict_pretty(properties)}',
                         level='debug')
+        paused = set()
+
+        # Unlike Kafka consumers, those of channels can be woken up. It does not block
+        # indefinitely if it has to switch topics or commit transactions periodically.
+        if self._channels is not None and self._input_mode == 'parity' \
+        and not self._exactly_once:
+            self._main_poll_timeout.max_timeout = None
 
         while not current_thread().will_stop:
             if not self._input_topics:
                 self.logger.log('No input topics, waiting...', level='debug')
-                time.sleep(Link.WAIT_INTERVAL)
+                self._wait_for_input_topics()
+                # Output of the generator
+                self._try_commit_transaction(consumer)
                 continue
 
             self._set_input_topic_assignments()
@@ -952,7 +1950,10 @@ class Link:
                     self.suicide('Unknown priority mode')
 
                 # Replaces the current subscription
-                consumer.subscribe(subscription)
+                if self._exactly_once:
+                    consumer.subscribe(subscription, on_revoke=self._on_revoke)
+                else:
+                    consumer.subscribe(subscription)
                 self.logger.log(f'[MAIN] listening on: {subscription}')
 
                 start_time = utils.get_timestamp_ms()
@@ -972,10 +1973,14 @@ class Link:
                             # outer loop so both loops are broken
                             break
 
-                    message = consumer.poll(Link.CONSUMER_POLL_TIMEOUT)
+                    paused = self._apply_backpressure(consumer, paused)
+                    message = consumer.poll(self._get_poll_timeout(paused))
+                    self._main_poll_timeout.record(message is not None)
 
                     if not message or (not message.key() and not message.value()):
-                        if not self._break_consumer_loop(subscription):
+                        self._try_commit_transaction(consumer)
+                        # Paused partitions return nothing, do not switch topics
+                        if paused or not self._break_consumer_loop(subscription):
                             continue
 
                         # New topic / restart if there are more topics or
@@ -997,6 +2002,22 @@ class Link:
                         start_time = utils.get_timestamp_ms()
                         restarted_time = True
 
+                    if self._exactly_once:
+                        with self._transaction_lock:
+                            self._begin_transaction()
+                            self._process_fused(consumer, message)
+                            self._transaction_offsets[(message.topic(), message.partition())] = \
+                                message.offset() + 1
+                            self._transaction_messages += 1
+                        self._try_commit_transaction(consumer)
+                        continue
+
+                    if self._fused:
+                        self._process_fused(consumer, message)
+                        continue
+
+                    self._in_flight.acquire(Link._get_message_size(message))
+
                     # Synchronous commit
                     if self._synchronous:
                         # Commit when the transformation is commited
@@ -1008,6 +2029,149 @@ class Link:
                         self._input_messages.put(message)
                         continue
 
+    def _process_fused(self, consumer, message):
+        """ The whole pipeline in the consumer thread, without queues. """
+        if self._is_message_known(message):
+            return
+        self._mark_known_message(message)
+
+        # Outputs may still be queued for the producer thread
+        size = Link._get_message_size(message)
+        self._in_flight.acquire(size)
+        release_callback = Callback(self._in_flight.release, [size])
+
+        commit_callback = Callback(mode=Callback.COMMIT_KAFKA_MESSAGE)
+        # The offsets are committed with the transaction
+        if self._synchronous and not self._exactly_once:
+            commit_callback.target = self._commit_kafka_message
+            commit_callback.args = [consumer, message]
+        self._decode_and_transform(message, commit_callback, release_callback)
+
+    def _get_poll_timeout(self, paused=False):
+        # Paused consumers check if they can be resumed after every poll
+        if self._adaptive_polling and not paused:
+            timeout = self._main_poll_timeout.get()
+        else:
+            timeout = Link.CONSUMER_POLL_TIMEOUT
+
+        if not self._transaction_open:
+            return timeout
+        remaining = self._get_transaction_remaining_time()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _get_transaction_remaining_time(self):
+        elapsed = (utils.get_timestamp_ms() - self._transaction_start) / 1000
+        return max(self._transaction_timeout - elapsed, 0)
+
+    def _wait_for_input_topics(self):
+        """ Until an input topic is added or the link is stopping. """
+        if self._adaptive_polling and not self._exactly_once:
+            timeout = None
+        else:
+            # Output of the generator in a transaction
+            timeout = Link.WAIT_INTERVAL
+        self._input_topics_event.wait(timeout)
+        self._input_topics_event.clear()
+
+    def _wake_up_consumers(self):
+        for name in ['_rpc_consumer', '_main_consumer']:
+            consumer = getattr(self, name, None)
+            # Only the consumers of channels
+            if hasattr(consumer, 'wake_up'):
+                consumer.wake_up()
+
+    @rpc
+    def polling_stats(self, context=None):
+        return {
+            'adaptive': self._adaptive_polling,
+            'main_consumer': self._main_poll_timeout.stats,
+            'input': self._input_timeout.stats,
+            'output': self._output_timeout.stats
+        }
+
+    def _begin_transaction(self):
+        """ Transactions are begun with the first consumed or produced message. """
+        with self._transaction_lock:
+            if self._transaction_open:
+                return
+            self._get_producer(None, True).begin_transaction()
+            self._transaction_open = True
+            self._transaction_start = utils.get_timestamp_ms()
+            self._transaction_messages = 0
+
+    def _try_commit_transaction(self, consumer):
+        """ Commit when the transaction is full or too old. """
+        if not self._transaction_open:
+            return
+        if self._transaction_messages < self._transaction_size \
+        and self._get_transaction_remaining_time() > 0:
+            return
+        self._commit_transaction(consumer)
+
+    def _commit_transaction(self, consumer):
+        """ The output and the offsets of the processed messages, atomically. """
+        from confluent_kafka import KafkaException, TopicPartition
+
+        with self._transaction_lock:
+            if not self._transaction_open:
+                return
+            producer = self._get_producer(None, True)
+
+            attempts = 1
+            while True:
+                try:
+                    # The position of the consumer may be past a message which failed
+                    offsets = [
+                        TopicPartition(topic, partition, offset)
+                        for (topic, partition), offset in self._transaction_offsets.items()
+                    ]
+                    if offsets:
+                        producer.send_offsets_to_transaction(offsets,
+                                                             consumer.consumer_group_metadata())
+                    producer.commit_transaction()
+                    break
+                except KafkaException as exception:
+                    error = exception.args[0]
+                    if error.txn_requires_abort():
+                        self._abort_transaction(consumer)
+                        return
+                    if not error.retriable() or attempts >= Link.MAX_COMMIT_ATTEMPTS:
+                        raise
+                    attempts += 1
+                    self.logger.log(f'retrying the commit of a transaction: {error}',
+                                    level='warn')
+
+            self._transaction_open = False
+            self._transaction_offsets = dict()
+            self.logger.log(f'transaction of {self._transaction_messages} messages commited',
+                            level='debug')
+
+    def _abort_transaction(self, consumer, rewind=True):
+        from confluent_kafka import OFFSET_BEGINNING
+
+        with self._transaction_lock:
+            if not self._transaction_open:
+                return
+            self.logger.log('aborting a transaction', level='warn')
+            self._get_producer(None, True).abort_transaction()
+            self._transaction_open = False
+            self._transaction_offsets = dict()
+
+        # The messages of the aborted transaction are consumed again, by this
+        # instance or, if it is stopping, by the next one
+        if not rewind:
+            return
+        for partition in consumer.committed(consumer.assignment()):
+            if partition.offset < 0:
+                partition.offset = OFFSET_BEGINNING
+            consumer.seek(partition)
+        with self._known_message_ids_lock:
+            self._known_message_ids = CircularOrderedSet(self._known_message_ids.size)
+
+    def _on_revoke(self, consumer, _):
+        # The offsets of the revoked partitions cannot be committed afterwards
+        self._commit_transaction(consumer)
+
     def _get_index_assignment(self, index, elements_no, base=1.7):
         """
         window_size implies a full cycle consuming all the queues with
@@ -1030,8 +2194,13 @@ class Link:
         pass
 
     def transform(self, _):
-        for thread in self._transform_main_executor.threads:
-            thread.stop()
+        self._transform_main_executor.stop()
+
+    # Columnar alternative to transform(), used if a schema is declared. A method
+    # transform_columns(self, batch) receives a NumPy structured array or an Arrow
+    # record batch and returns another one (or None). Its rows are sent as individual
+    # values or, with columnar_output, the whole batch is sent as a single message.
+    transform_columns = None
 
     def finish(self):
         pass
@@ -1050,26 +2219,111 @@ class Link:
         elif not isinstance(output_content, list):
             electron = Electron(value=output_content, topic=topic, unpack_if_string=True)
         else:
-            for i, item in enumerate(output_content):
-                # Last item includes the callback
-                if i == len(output_content) - 1:
-                    self.send(item, topic=topic, callback=callback, synchronous=synchronous)
-                else:
-                    self.send(item, topic=topic, synchronous=synchronous)
+            self.send_many(output_content,
+                           topic=topic,
+                           callback=callback,
+                           callback_args=callback_args,
+                           callback_kwargs=callback_kwargs,
+                           synchronous=synchronous)
             return
 
         if callback is not None:
             electron.callbacks.append(Callback(callback, callback_args, callback_kwargs))
 
+        if self._downstream is not None:
+            self._downstream._receive([electron])
+            return
+
         if synchronous is None:
             synchronous = self._synchronous
 
+        self._throttle(electron)
+
         # Electrons can be sent asynchronously / synchronously individually
         if synchronous:
             self._produce(electron, synchronous=synchronous)
         else:
             self._output_messages.put(electron)
 
+    def send_many(self,
+                  values,
+                  topic=None,
+                  key_fn=None,
+                  callback=None,
+                  callback_args=None,
+                  callback_kwargs=None,
+                  synchronous=None):
+        """
+        Send a batch of values or electrons with a single queue operation. Unlike
+        send(), values are not copied. The callback is executed after the last one
+        is produced; key_fn, if given, sets the key of every electron from its value.
+        """
+        electrons = []
+        for value in values:
+            if isinstance(value, Electron):
+                electron = copy.copy(value)
+                electron.callbacks = list(value.callbacks)
+                if topic:
+                    electron.topic = topic
+            else:
+                electron = Electron(value=value, topic=topic, unpack_if_string=True)
+            if key_fn is not None:
+                electron.key = key_fn(electron.value)
+            electrons.append(electron)
+
+        if not electrons:
+            return
+
+        if callback is not None:
+            electrons[-1].callbacks.append(Callback(callback, callback_args, callback_kwargs))
+
+        if self._downstream is not None:
+            self._downstream._receive(electrons)
+            return
+
+        if synchronous is None:
+            synchronous = self._synchronous
+
+        if synchronous:
+            # A single flush per batch instead of one per electron
+            for i, electron in enumerate(electrons, start=1):
+                self._throttle(electron)
+                flush = i == len(electrons) or not i % Link.SEND_BATCH_SIZE
+                self._produce(electron, synchronous=True, flush=flush)
+        elif self._rate_limiter.enabled:
+            for electron in electrons:
+                self._throttle(electron)
+                self._output_messages.put(electron)
+        else:
+            self._output_messages.put_many(electrons)
+
+    def _generator(self):
+        result = self.generator()
+        if not inspect.isgenerator(result):
+            return
+
+        # Generators which yield are consumed once and then the thread exits
+        for item in result:
+            if current_thread().will_stop:
+                result.close()
+                break
+
+            # Lists and iterators are batches
+            if isinstance(item, list) or hasattr(item, '__next__'):
+                iterator = iter(item)
+                batches = iter(lambda: list(islice(iterator, Link.SEND_BATCH_SIZE)), [])
+            else:
+                batches = [[item]]
+
+            for batch in batches:
+                # The output queue is drained by the producer before more are generated
+                while not self._output_messages.wait_until_below(Link.MAX_GENERATOR_BACKLOG,
+                                                                 timeout=Link.WAIT_INTERVAL):
+                    if current_thread().will_stop:
+                        return
+                self.send_many(batch)
+        raise SystemExit
+
     def generator(self):
         self.logger.log('Generator method undefined. Disabled.', level='debug')
         # Kill the generator thread
@@ -1094,6 +2348,8 @@ class Link:
                 if self._input_mode == 'exp':
                     self._set_input_topic_assignments()
                 self._changed_input_topics = True
+                self._input_topics_event.set()
+                self._wake_up_consumers()
                 self.logger.log(f'added input {input_topic}')
 
     def remove_input_topic(self, input_topic):
@@ -1103,6 +2359,8 @@ class Link:
                 if self._input_mode == 'exp':
                     self._set_input_topic_assignments()
                 self._changed_input_topics = True
+                self._input_topics_event.set()
+                self._wake_up_consumers()
                 self.logger.log(f'removed input {input_topic}')
 
     def start(self, embedded=False, startup_text=None, setup_kwargs=None):
@@ -1118,10 +2376,9 @@ class Link:
         self.logger.log(startup_text)
         self.logger.log(f'Catenae v{catenae.__version__} {catenae.__version_name__}')
 
-        if self._kafka_endpoint:
+        if self._is_connected():
             self._set_kafka_common_properties()
             self._setup_kafka_producers()
-        self._set_connectors()
 
         try:
             self.logger.log(f'link {self._uid} is starting...')
@@ -1140,69 +2397,251 @@ class Link:
                 Thread(self._join_tasks).start()
             else:
                 self._setup_signals_handler()
-                while not self._stopped:
-                    time.sleep(Link.WAIT_INTERVAL)
+                while not self._stop_event.is_set():
+                    try:
+                        self._stop_event.wait()
+                    except SystemExit:
+                        # suicide() from a signal handler
+                        pass
                 self._join_tasks()
 
+    @property
+    def shutdown_stats(self):
+        """ Seconds spent in every phase of the last shutdown. """
+        return dict(self._shutdown_stats)
+
     def _join_tasks(self):
+        self._stop_event.wait()
         self.logger.log('waiting for the managed threads to stop...', level='debug')
 
-        for thread in self._safe_stop_threads:
-            self._join_if_not_current_thread(thread)
-        self.logger.log('safe stop threads terminated.', level='debug')
+        # Every phase waits until it is done or the deadline of the whole shutdown
+        deadline = time.monotonic() + Link.SUICIDE_TIMEOUT
+        phases = [('stop consuming', self._stop_consuming), ('drain', self._drain_in_flight),
+                  ('flush', self._flush_output), ('commit', self._final_commit),
+                  ('close', self._close)]
 
-        if self._kafka_endpoint:
-            if hasattr(self, '_producer_thread'):
-                self._producer_thread.join(Link.SUICIDE_TIMEOUT)
-            self.logger.log('producer thread terminated.')
+        start_time = time.monotonic()
+        for name, phase in phases:
+            phase_start_time = time.monotonic()
+            try:
+                phase(deadline)
+            except Exception:
+                self.logger.log(f'error in the shutdown phase: {name}', level='exception')
+            self._shutdown_stats[name] = time.monotonic() - phase_start_time
+        self._shutdown_stats['total'] = time.monotonic() - start_time
 
-            if hasattr(self, '_consumer_rpc_thread'):
-                self._consumer_rpc_thread.join(Link.SUICIDE_TIMEOUT)
-            self.logger.log('consumer RPC thread terminated.')
+        phase_times = ', '.join(f'{name}: {self._shutdown_stats[name]:.3f}s' for name, _ in phases)
+        self.logger.log(f'stopped in {self._shutdown_stats["total"]:.3f}s ({phase_times})')
 
-            if hasattr(self, '_consumer_main_thread'):
-                self._consumer_main_thread.join(Link.SUICIDE_TIMEOUT)
-            self.logger.log('consumer main thread terminated.')
+    @staticmethod
+    def _get_remaining_time(deadline):
+        return max(deadline - time.monotonic(), 0)
 
-            if hasattr(self, '_input_handler_thread'):
-                self._input_handler_thread.join(Link.SUICIDE_TIMEOUT)
-            self.logger.log('input handler thread terminated.')
+    def _stop_thread(self, thread, deadline, queue=None):
+        thread.stop()
+        if queue is not None:
+            queue.interrupt()
+        if thread is not current_thread():
+            thread.join(Link._get_remaining_time(deadline))
 
-            if hasattr(self, '_transform_rpc_executor'):
-                for thread in self._transform_rpc_executor.threads:
-                    self._join_if_not_current_thread(thread)
-            self.logger.log('transform RPC executor terminated.')
+    def _stop_executor(self, executor, deadline):
+        executor.stop()
+        for thread in list(executor.threads):
+            if thread is not current_thread():
+                thread.join(Link._get_remaining_time(deadline))
 
-            if hasattr(self, '_transform_main_executor'):
-                for thread in self._transform_main_executor.threads:
-                    self._join_if_not_current_thread(thread)
-            self.logger.log('transform main executor terminated.')
+    def _stop_consuming(self, deadline):
+        """ Loops (the generator included) and consumers. """
+        self._scheduler.stop()
+        for thread in self._safe_stop_threads:
+            thread.stop()
+        for thread in self._scheduler.threads:
+            self._stop_thread(thread, deadline)
+        for thread in self._safe_stop_threads:
+            self._stop_thread(thread, deadline)
 
-    def _join_if_not_current_thread(self, thread):
-        if thread is not current_thread():
-            thread.join(Link.SUICIDE_TIMEOUT)
+        if not self._is_connected():
+            return
+        for name in ['_consumer_rpc_thread', '_consumer_main_thread']:
+            if hasattr(self, name):
+                getattr(self, name).stop()
+        self._input_topics_event.set()
+        self._wake_up_consumers()
+        for name in ['_consumer_rpc_thread', '_consumer_main_thread']:
+            if hasattr(self, name):
+                self._stop_thread(getattr(self, name), deadline)
+
+    def _drain_in_flight(self, deadline):
+        """ Consumed messages are transformed. """
+        if not self._is_connected():
+            return
+
+        self._input_messages.wait_until_below(1, Link._get_remaining_time(deadline))
+        if hasattr(self, '_input_handler_thread'):
+            self._stop_thread(self._input_handler_thread, deadline, self._input_messages)
+        self._flush_column_batch()
+
+        for name in ['_transform_rpc_executor', '_transform_main_executor']:
+            if hasattr(self, name):
+                executor = getattr(self, name)
+                if not executor.wait_idle(Link._get_remaining_time(deadline)):
+                    self.logger.log(f'pending tasks discarded ({name})', level='warn')
+                self._stop_executor(executor, deadline)
+
+    def _flush_output(self, deadline):
+        """ Transformed messages are delivered. """
+        if not self._is_connected():
+            return
+
+        self._output_messages.wait_until_below(1, Link._get_remaining_time(deadline))
+        if hasattr(self, '_producer_thread'):
+            self._stop_thread(self._producer_thread, deadline, self._output_messages)
+        if len(self._output_messages):
+            self.logger.log(f'output messages discarded: {len(self._output_messages)}',
+                            level='warn')
+
+        for producer in list(self._producers.values()):
+            producer.flush(Link._get_remaining_time(deadline))
+
+        # Pending spilled messages are recovered on restart
+        if self._spill_buffer is not None:
+            self._spill_buffer.close()
+
+    def _final_commit(self, deadline):
+        if self._exactly_once and hasattr(self, '_main_consumer'):
+            # The output of a failed message must not be commited
+            if self._stopped_on_error:
+                self._abort_transaction(self._main_consumer, rewind=False)
+            else:
+                self._commit_transaction(self._main_consumer)
+
+        # Writes of uncommitted messages are discarded
+        if self._buffers and not self._is_commit_bound():
+            self._flush_buffers()
+            self.logger.log('buffers flushed.')
+
+    def _close(self, deadline):
+        # The instance leaves the consumer group right away instead of timing out
+        for name in ['_rpc_consumer', '_main_consumer']:
+            if hasattr(self, name):
+                getattr(self, name).close()
 
     def _setup_kafka_producers(self):
-        sync_producer_properties = dict(self._kafka_producer_synchronous_properties)
-        self._sync_producer = Producer(sync_producer_properties)
-        self.logger.log(
-            f'sync producer properties: {utils.dump_dict_pretty(sync_producer_properties)}',
-            level='debug')
+        self._sync_producer = self._get_producer(None, True)
+        self._async_producer = self._get_producer(None, False)
+
+        if self._spill_path:
+            self._spill_buffer = SpillBuffer(self._spill_path)
+            if len(self._spill_buffer):
+                self.logger.log(f'spilled messages recovered: {len(self._spill_buffer)}')
+
+    def _get_producer(self, topic, synchronous):
+        """ The producers are shared by all the topics with the same codec. """
+        if self._channels is not None:
+            return self._channels.producer
+
+        from confluent_kafka import Producer
+
+        # A single transactional producer with the default codec
+        if self._exactly_once:
+            topic = None
+            synchronous = True
+
+        codec = self._compression_codecs.get(topic, Link.DEFAULT_COMPRESSION_CODEC)
+        producer = self._producers.get((codec, synchronous))
+        if producer is not None:
+            return producer
+
+        with self._producers_lock:
+            if (codec, synchronous) not in self._producers:
+                if synchronous:
+                    properties = dict(self._kafka_producer_synchronous_properties)
+                    mode = 'sync'
+                else:
+                    properties = dict(self._kafka_producer_common_properties)
+                    mode = 'async'
+                properties['compression.codec'] = codec
+                if self._exactly_once:
+                    properties['transactional.id'] = f'catenae_{self._consumer_group}_{self._uid}'
+                self._producers[(codec, synchronous)] = Producer(properties)
+                if self._exactly_once:
+                    self._producers[(codec, synchronous)].init_transactions()
+                self.logger.log(
+                    f'{mode} producer properties: {utils.dump_dict_pretty(properties)}',
+                    level='debug')
+            return self._producers[(codec, synchronous)]
+
+    def _get_dictionaries_producer(self):
+        """ Not transactional, dictionaries are kept even if a transaction is aborted. """
+        if not self._exactly_once:
+            return self._get_producer(Link.DICTIONARIES_TOPIC, True)
+
+        from confluent_kafka import Producer
+
+        with self._producers_lock:
+            if self._dictionaries_producer is None:
+                self._dictionaries_producer = Producer(
+                    dict(self._kafka_producer_synchronous_properties))
+            return self._dictionaries_producer
+
+    def _train_dictionaries(self):
+        for topic in self._dictionaries.topics:
+            if not self._dictionaries.needs_training(topic):
+                continue
 
-        async_producer_properties = dict(self._kafka_producer_common_properties)
-        self._async_producer = Producer(async_producer_properties)
-        self.logger.log(
-            f'async producer properties: {utils.dump_dict_pretty(async_producer_properties)}',
-            level='debug')
+            dictionary_id, data = self._dictionaries.train(topic)
+            # Consumers must be able to fetch it before it is used
+            producer = self._get_dictionaries_producer()
+            producer.produce(topic=Link.DICTIONARIES_TOPIC,
+                             key=str(dictionary_id).encode('utf-8'),
+                             value=data)
+            producer.flush()
+            self._dictionaries.activate(topic, dictionary_id)
+            self.logger.log(f'new dictionary for {topic}: {dictionary_id}')
+
+    def _fetch_dictionary(self, dictionary_id):
+        """ Read the dictionaries topic until the given one is found. """
+        from confluent_kafka import Consumer, TopicPartition, OFFSET_BEGINNING
+
+        properties = dict(self._kafka_consumer_synchronous_properties)
+        properties['group.id'] = f'catenae_dictionaries_{self._uid}'
+        consumer = Consumer(properties)
+        try:
+            metadata = consumer.list_topics(Link.DICTIONARIES_TOPIC,
+                                            timeout=Link.DICTIONARY_FETCH_TIMEOUT)
+            consumer.assign([
+                TopicPartition(Link.DICTIONARIES_TOPIC, partition, OFFSET_BEGINNING)
+                for partition in metadata.topics[Link.DICTIONARIES_TOPIC].partitions
+            ])
+
+            start_timestamp = utils.get_timestamp()
+            while not self._dictionaries.has(dictionary_id):
+                if utils.get_timestamp() - start_timestamp > Link.DICTIONARY_FETCH_TIMEOUT:
+                    raise errors.TimeoutError
+                message = consumer.poll(Link.CONSUMER_POLL_TIMEOUT)
+                if not message or message.error() or not message.key():
+                    continue
+                self._dictionaries.add(int(message.key()), message.value())
+        finally:
+            consumer.close()
+        self.logger.log(f'dictionary fetched: {dictionary_id}')
+
+    @staticmethod
+    def _get_dictionary_id(message):
+        for name, value in message.headers() or []:
+            if name == Link.DICTIONARY_HEADER:
+                return int(value)
+        return None
 
     def _launch_tasks(self):
         # JSON-RPC
+        # from .json_rpc import JsonRPC
         # self._jsonrpc_process = Process(
         #     target=JsonRPC(self._jsonrpc_props['port'], self._jsonrpc_conn2, self.logger).run)
         # self._jsonrpc_process.daemon = True
         # self._jsonrpc_process.start()
 
-        if self._kafka_endpoint:
+        if self._is_connected():
             # Unavailable instances monitor
             # self.loop(self._check_instances, interval=Link.CHECK_INSTANCES_INTERVAL, safe_stop=True)
 
@@ -1212,6 +2651,21 @@ class Link:
             # Report existence periodically
             # self.loop(self._report_existence, interval=Link.REPORT_EXISTENCE_INTERVAL)
 
+            # Expire the RPC requests without reply
+            self.loop(self._expire_rpc_requests, interval=Link.RPC_REQUEST_EXPIRY_INTERVAL)
+
+            if self._spill_buffer is not None:
+                self.loop(self._update_spill_stats, interval=Link.SPILL_STATS_INTERVAL)
+
+            if self._blob_store_option is not None:
+                self.loop(self._purge_blobs, interval=Link.BLOB_PURGE_INTERVAL, wait=True)
+
+            # Dictionaries are distributed through Kafka
+            if self._dictionary_topics and self._channels is None:
+                self.loop(self._train_dictionaries,
+                          interval=self._dictionaries.retrain_interval,
+                          wait=True)
+
             # Kafka RPC consumer
             consumer_kwargs = {'target': self._kafka_rpc_consumer}
             self._consumer_rpc_thread = Thread(self._thread_target, kwargs=consumer_kwargs)
@@ -1230,13 +2684,14 @@ class Link:
 
             # Transform
             self._transform_rpc_executor = ThreadPool(self, self._num_rpc_threads)
-            self._transform_main_executor = ThreadPool(self, self._num_main_threads)
+            self._transform_main_executor = ThreadPool(self, self._num_main_threads,
+                                                       self._max_main_threads)
             transform_kwargs = {'target': self._input_handler}
             self._input_handler_thread = Thread(self._thread_target, kwargs=transform_kwargs)
             self._input_handler_thread.start()
 
         # Generator
-        self.loop(self.generator, interval=0, safe_stop=True)
+        self.loop(self._generator, interval=0, safe_stop=True)
 
     def _report_existence(self):
         kwargs = {
@@ -1250,25 +2705,46 @@ class Link:
         if not hasattr(self, '_log_level'):
             self._log_level = log_level.upper()
 
-    def _set_connectors(self):
-        try:
-            self._aerospike = AerospikeConnector(self._aerospike_host,
-                                                 self._aerospike_port,
-                                                 connect=True)
-        except AttributeError:
-            self._aerospike = None
+    def _get_aerospike_connector(self):
+        if not hasattr(self, '_aerospike_host'):
+            return None
 
-        try:
-            self._mongodb = MongodbConnector(self._mongodb_host, self._mongodb_port, connect=True)
-        except AttributeError:
-            self._mongodb = None
+        from easyaerospike import AerospikeConnector
+        from .batching import BatchedAerospikeConnector
+        return BatchedAerospikeConnector(AerospikeConnector(self._aerospike_host,
+                                                            self._aerospike_port,
+                                                            connect=True),
+                                         coalesce_window=self._aerospike_coalesce_window)
+
+    def _get_mongodb_connector(self):
+        if not hasattr(self, '_mongodb_host'):
+            return None
 
+        from easymongo import MongodbConnector
+        return MongodbConnector(self._mongodb_host, self._mongodb_port, connect=True)
+
+    def _get_rocksdb_connector(self):
+        if not hasattr(self, '_rocksdb_path'):
+            return None
+
+        from easyrocks import DB as RocksDB
         try:
-            self._rocksdb = RocksDB(self._rocksdb_path)
-        except AttributeError:
-            self._rocksdb = None
+            return RocksDB(self._rocksdb_path)
         except Exception:
-            self._rocksdb = RocksDB(self._rocksdb_path, read_only=True)
+            return RocksDB(self._rocksdb_path, read_only=True)
+
+    def _get_state_store(self):
+        if self.rocksdb is None:
+            return None
+
+        from .state import StateStore
+        state = StateStore(self._rocksdb, max_items=self._state_cache_size, ttl=self._state_ttl)
+        self._buffers.append(state)
+        if not self._is_commit_bound():
+            self.loop(state.flush, interval=Link.STATE_FLUSH_INTERVAL, wait=True)
+        if self._state_ttl is not None:
+            self.loop(state.purge_expired, interval=Link.STATE_PURGE_INTERVAL, wait=True)
+        return state
 
     def _set_consumer_group(self, consumer_group, uid_consumer_group):
         if hasattr(self, 'consumer_group'):
@@ -1295,7 +2771,7 @@ class Link:
     def _set_kafka_common_properties(self):
         common_properties = {
             'bootstrap.servers': self._kafka_endpoint,
-            'compression.codec': 'snappy',
+            'compression.codec': Link.DEFAULT_COMPRESSION_CODEC,
             'api.version.request': True
         }
 
@@ -1309,6 +2785,8 @@ class Link:
             'max.poll.interval.ms': self._consumer_timeout,  # processing time
             'enable.auto.commit': True,
             'auto.commit.interval.ms': 5000,
+            # Messages of aborted transactions are skipped
+            'isolation.level': 'read_committed',
             'default.topic.config': {
                 'auto.offset.reset': 'smallest'
             }
@@ -1494,6 +2972,27 @@ class Link:
                             dest="sequential",
                             help='Sequential mode is enabled.',
                             required=False)
+        parser.add_argument('--fused',
+                            action="store_true",
+                            dest="fused",
+                            help='Transform in the consumer thread in seq mode.',
+                            required=False)
+        parser.add_argument('--adaptive-polling',
+                            action="store_true",
+                            dest="adaptive_polling",
+                            help='Poll and wait timeouts tuned to the input traffic.',
+                            required=False)
+        parser.add_argument('--exactly-once',
+                            action="store_true",
+                            dest="exactly_once",
+                            help='Kafka transactions, implies sync mode.',
+                            required=False)
+        parser.add_argument('--transaction-size',
+                            action="store",
+                            dest="transaction_size",
+                            type=int,
+                            help='Max consumed messages per transaction.',
+                            required=False)
         parser.add_argument('--random-consumer-group',
                             action="store_true",
                             dest="uid_consumer_group",
@@ -1502,13 +3001,82 @@ class Link:
         parser.add_argument('--rpc-threads',
                             action="store",
                             dest="num_rpc_threads",
+                            type=int,
                             help='Number of RPC threads.',
                             required=False)
         parser.add_argument('--main-threads',
                             action="store",
                             dest="num_main_threads",
+                            type=int,
                             help='Number of main threads.',
                             required=False)
+        parser.add_argument('--max-main-threads',
+                            action="store",
+                            dest="max_main_threads",
+                            type=int,
+                            help='Transforms run concurrently in up to this number of threads.',
+                            required=False)
+        parser.add_argument('--max-in-flight-messages',
+                            action="store",
+                            dest="max_in_flight_messages",
+                            type=int,
+                            help='Consumed messages not yet produced before pausing.',
+                            required=False)
+        parser.add_argument('--max-in-flight-bytes',
+                            action="store",
+                            dest="max_in_flight_bytes",
+                            type=int,
+                            help='Bytes of consumed messages not yet produced before pausing.',
+                            required=False)
+        parser.add_argument('--rate-limit',
+                            action="store",
+                            dest="rate_limit",
+                            type=float,
+                            help='Max produced messages per second.',
+                            required=False)
+        parser.add_argument('--topic-rate-limits',
+                            action="store",
+                            dest="topic_rate_limits",
+                            help='Max messages per second by topic, e.g., topic1:100,topic2:5.',
+                            required=False)
+        parser.add_argument('--key-rate-limit',
+                            action="store",
+                            dest="key_rate_limit",
+                            type=float,
+                            help='Max produced messages per second for every key.',
+                            required=False)
+        parser.add_argument('--spill-path',
+                            action="store",
+                            dest="spill_path",
+                            help='Directory for the output messages while Kafka is unavailable.',
+                            required=False)
+        parser.add_argument('--spill-threshold',
+                            action="store",
+                            dest="spill_threshold",
+                            type=int,
+                            help='Undelivered bytes in the producer before spilling to disk.',
+                            required=False)
+        parser.add_argument('--compression-codecs',
+                            action="store",
+                            dest="compression_codecs",
+                            help='Codec by output topic, e.g., topic1:zstd,topic2:none.',
+                            required=False)
+        parser.add_argument('--blob-store',
+                            action="store",
+                            dest="blob_store",
+                            help='Directory or "rocksdb" to store the values too big to produce.',
+                            required=False)
+        parser.add_argument('--column-batch-size',
+                            action="store",
+                            dest="column_batch_size",
+                            type=int,
+                            help='Rows per batch of transform_columns().',
+                            required=False)
+        parser.add_argument('--dictionary-topics',
+                            action="store",
+                            dest="dictionary_topics",
+                            help='Output topics compressed with zstd dictionaries.',
+                            required=False)
 
     def _set_catenae_properties_from_args(self, args):
         if args.log_level:
@@ -1521,12 +3089,48 @@ class Link:
             self._synchronous = True
         if args.sequential:
             self._sequential = True
+        if args.fused:
+            self._fused = True
+        if args.adaptive_polling:
+            self._adaptive_polling = True
+        if args.exactly_once:
+            self._exactly_once = True
+        if args.transaction_size:
+            self._transaction_size = args.transaction_size
         if args.uid_consumer_group:
             self._uid_consumer_group = True
         if args.num_rpc_threads:
             self._num_rpc_threads = args.num_rpc_threads
         if args.num_main_threads:
             self._num_main_threads = args.num_main_threads
+        if args.max_main_threads:
+            self._max_main_threads = args.max_main_threads
+        if args.max_in_flight_messages:
+            self._max_in_flight_messages = args.max_in_flight_messages
+        if args.max_in_flight_bytes:
+            self._max_in_flight_bytes = args.max_in_flight_bytes
+        if args.rate_limit:
+            self._rate_limit = args.rate_limit
+        if args.topic_rate_limits:
+            self._topic_rate_limits = {
+                topic: float(rate)
+                for topic, rate in (item.split(':') for item in args.topic_rate_limits.split(','))
+            }
+        if args.key_rate_limit:
+            self._key_rate_limit = args.key_rate_limit
+        if args.spill_path:
+            self._spill_path = args.spill_path
+        if args.spill_threshold:
+            self._spill_threshold = args.spill_threshold
+        if args.compression_codecs:
+            self._compression_codecs = dict(
+                item.split(':') for item in args.compression_codecs.split(','))
+        if args.dictionary_topics:
+            self._dictionary_topics = args.dictionary_topics.split(',')
+        if args.blob_store:
+            self._blob_store_option = args.blob_store
+        if args.column_batch_size:
+            self._column_batch_size = args.column_batch_size
 
     def _load_args(self):
         parser = argparse.ArgumentParser()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+
+class AdaptiveTimeout:
+    """
+    Timeouts for the polls of a thread, from the mean time between the arrivals of
+    its messages. Dense traffic is drained without waiting, sparse traffic is
+    waited for a few mean intervals and, after an empty poll like that, the source
+    is idle and the timeout is max_timeout (None blocks until it is woken up).
+    """
+
+    # Mean interval below which polls do not wait
+    DENSE_INTERVAL = 0.0005
+    INTERVAL_FACTOR = 4
+    MIN_TIMEOUT = 0.001
+    DECAY = 0.8
+
+    def __init__(self, max_timeout=None):
+        self.max_timeout = max_timeout
+        self._mean_interval = None
+        self._last_arrival = None
+        self._empty_polls = 0
+        self._polls = 0
+        self._total_empty_polls = 0
+
+    @property
+    def stats(self):
+        return {
+            'mean_interval': self._mean_interval,
+            'polls': self._polls,
+            'empty_polls': self._total_empty_polls
+        }
+
+    def record(self, arrived):
+        self._polls += 1
+        if not arrived:
+            self._empty_polls += 1
+            self._total_empty_polls += 1
+            return
+
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            interval = now - self._last_arrival
+            if self._mean_interval is None:
+                self._mean_interval = interval
+            else:
+                self._mean_interval = self._mean_interval * AdaptiveTimeout.DECAY \
+                    + interval * (1 - AdaptiveTimeout.DECAY)
+        self._last_arrival = now
+        self._empty_polls = 0
+
+    def get(self):
+        if self._mean_interval is None or self._empty_polls > 1:
+            return self.max_timeout
+
+        if not self._empty_polls and self._mean_interval < AdaptiveTimeout.DENSE_INTERVAL:
+            return 0
+
+        timeout = max(self._mean_interval * AdaptiveTimeout.INTERVAL_FACTOR,
+                      AdaptiveTimeout.MIN_TIMEOUT)
+        if self.max_timeout is None:
+            return timeout
+        return min(timeout, self.max_timeout)
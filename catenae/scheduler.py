@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import heapq
+import math
+import random
+import time
+import traceback
+from itertools import count
+from threading import Condition
+from .custom_threading import Thread, ThreadPool
+
+
+class ScheduledTask:
+    """ A loop of the scheduler. It can be stopped and joined as the threads of the loops. """
+    def __init__(self, scheduler, target, args, kwargs, interval, fixed_rate, jitter, level):
+        self._scheduler = scheduler
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.fixed_rate = fixed_rate
+        self.jitter = jitter
+        self.level = level
+
+        # Next execution time, without and with jitter
+        self.base_time = None
+        self.next_time = None
+        self.runs = 0
+        self.overruns = 0
+        self.last_duration = 0.
+        self.max_lag = 0.
+        self.running = False
+        self.cancelled = False
+
+    @property
+    def name(self):
+        return getattr(self.target, '__name__', repr(self.target))
+
+    @property
+    def stats(self):
+        return {
+            'name': self.name,
+            'interval': self.interval,
+            'fixed_rate': self.fixed_rate,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'last_duration': self.last_duration,
+            'max_lag': self.max_lag
+        }
+
+    @property
+    def will_stop(self):
+        return self.cancelled
+
+    def is_alive(self):
+        return not self.cancelled or self.running
+
+    def stop(self):
+        self._scheduler.cancel(self)
+
+    def join(self, timeout=None):
+        """ Wait until the running execution, if any, ends. """
+        return self._scheduler.wait_done(self, timeout)
+
+
+class Scheduler:
+    """
+    Periodic tasks dispatched by a single thread, in order of their next execution
+    time, to a pool of worker threads, so long executions do not delay the rest.
+
+    Fixed-delay tasks wait for the interval once every execution ends. Fixed-rate
+    tasks are executed every interval since the first execution; executions due
+    while the previous one is still running (overruns) are skipped and counted.
+    """
+
+    MIN_WORKERS = 2
+    MAX_WORKERS = 4
+
+    def __init__(self, link_instance):
+        self.link_instance = link_instance
+        self._condition = Condition()
+        # (next_time, sequence, task)
+        self._heap = []
+        self._sequence = count()
+        self._tasks = []
+        self._thread = None
+        self._pool = None
+        self._stopped = False
+
+    @property
+    def threads(self):
+        threads = [] if self._thread is None else [self._thread]
+        if self._pool is not None:
+            threads += self._pool.threads
+        return threads
+
+    @property
+    def stats(self):
+        with self._condition:
+            return [task.stats for task in self._tasks if not task.cancelled]
+
+    def schedule(self,
+                 target,
+                 args=None,
+                 kwargs=None,
+                 interval=1,
+                 wait=False,
+                 fixed_rate=False,
+                 jitter=0,
+                 level='debug'):
+        if interval <= 0:
+            raise ValueError('scheduled tasks need a positive interval')
+
+        if args is None:
+            args = []
+
+        if not isinstance(args, list):
+            args = [args]
+
+        if kwargs is None:
+            kwargs = {}
+
+        task = ScheduledTask(self, target, args, kwargs, interval, fixed_rate, jitter, level)
+        with self._condition:
+            if self._stopped:
+                task.cancelled = True
+                return task
+
+            self._tasks.append(task)
+            self._push(task, time.monotonic() + (interval if wait else 0))
+            if self._thread is None:
+                self._pool = ThreadPool(self.link_instance, Scheduler.MIN_WORKERS,
+                                        Scheduler.MAX_WORKERS)
+                self._thread = Thread(self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return task
+
+    def cancel(self, task):
+        with self._condition:
+            task.cancelled = True
+            if task in self._tasks:
+                self._tasks.remove(task)
+            self._condition.notify_all()
+
+    def wait_done(self, task, timeout=None):
+        with self._condition:
+            return self._condition.wait_for(lambda: not task.running, timeout)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            for task in self._tasks:
+                task.cancelled = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.stop()
+        if self._pool is not None:
+            self._pool.stop()
+
+    def _push(self, task, base_time):
+        task.base_time = base_time
+        task.next_time = base_time
+        if task.jitter:
+            task.next_time += random.uniform(0, task.jitter)
+        heapq.heappush(self._heap, (task.next_time, next(self._sequence), task))
+
+    def _reschedule(self, task):
+        if not task.fixed_rate:
+            self._push(task, time.monotonic() + task.interval)
+            return
+
+        base_time = task.base_time + task.interval
+        now = time.monotonic()
+        if base_time < now:
+            # The previous execution took longer than the interval, missed ones are skipped
+            missed = math.ceil((now - base_time) / task.interval)
+            task.overruns += missed
+            base_time += missed * task.interval
+            self.link_instance.logger.log(
+                f'loop overrun ({task.name}), {missed} executions skipped', level='warn')
+        self._push(task, base_time)
+
+    def _get_next_task(self):
+        """ None once the scheduler is stopped. """
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                next_time, _, task = self._heap[0]
+                timeout = next_time - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+                heapq.heappop(self._heap)
+                if task.cancelled:
+                    continue
+
+                if task.running:
+                    # A fixed-rate task still running
+                    task.overruns += 1
+                    self.link_instance.logger.log(
+                        f'loop overrun ({task.name}), execution skipped', level='warn')
+                    self._reschedule(task)
+                    continue
+
+                task.running = True
+                task.max_lag = max(task.max_lag, -timeout)
+                if task.fixed_rate:
+                    self._reschedule(task)
+                return task
+
+    def _run(self):
+        while True:
+            task = self._get_next_task()
+            if task is None:
+                return
+
+            with self._condition:
+                if self._stopped:
+                    return
+            self._pool.submit(self._execute, [task])
+
+    def _execute(self, task):
+        self.link_instance.logger.log(f'new loop iteration ({task.name})', level=task.level)
+        start_time = time.monotonic()
+
+        error = False
+        try:
+            task.target(*task.args, **task.kwargs)
+        except SystemExit:
+            # As if the thread of the loop had exited
+            task.cancelled = True
+        except Exception:
+            traceback.print_exc()
+            task.cancelled = True
+            error = True
+
+        duration = time.monotonic() - start_time
+        with self._condition:
+            task.running = False
+            task.runs += 1
+            task.last_duration = duration
+            if not task.cancelled and not task.fixed_rate:
+                self._reschedule(task)
+            self._condition.notify_all()
+
+        if error:
+            try:
+                self.link_instance.suicide(f'error when executing {task.target}')
+            except SystemExit:
+                pass
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+from pickle5 import pickle
+
+# Pickle 5 with out-of-band buffers. Buffers over OUT_OF_BAND_THRESHOLD bytes
+# (e.g., NumPy arrays or bytearrays) are framed after the pickle stream instead
+# of being copied into it, and they are loaded as views over the received value.
+#
+#   MAGIC | buffers count | stream size | buffer sizes | stream | buffers
+#
+# Every section starts at a multiple of ALIGNMENT bytes. Values without big
+# buffers are regular pickles.
+
+MAGIC = b'\xffCTN5'
+ALIGNMENT = 8
+OUT_OF_BAND_THRESHOLD = 65536
+
+_COUNT = struct.Struct('<I')
+_SIZE = struct.Struct('<Q')
+
+
+def _get_padding(size):
+    return -size % ALIGNMENT
+
+
+def dumps(obj):
+    buffers = []
+
+    def buffer_callback(buffer):
+        if buffer.raw().nbytes < OUT_OF_BAND_THRESHOLD:
+            return True  # In-band
+        buffers.append(buffer.raw())
+        return False
+
+    stream = pickle.dumps(obj, protocol=5, buffer_callback=buffer_callback)
+    if not buffers:
+        return stream
+
+    header = [MAGIC, _COUNT.pack(len(buffers)), _SIZE.pack(len(stream))]
+    header += [_SIZE.pack(buffer.nbytes) for buffer in buffers]
+    header_size = sum(len(part) for part in header)
+
+    parts = header + [b'\0' * _get_padding(header_size), stream]
+    parts.append(b'\0' * _get_padding(len(stream)))
+    for buffer in buffers:
+        parts.append(buffer)
+        parts.append(b'\0' * _get_padding(buffer.nbytes))
+    # The only copy of the buffers
+    return b''.join(parts)
+
+
+def loads(data):
+    """ Out-of-band buffers are read-only views over data. """
+    if not data[:len(MAGIC)] == MAGIC:
+        return pickle.loads(data)
+
+    offset = len(MAGIC)
+    count, = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    stream_size, = _SIZE.unpack_from(data, offset)
+    offset += _SIZE.size
+    buffer_sizes = []
+    for _ in range(count):
+        buffer_sizes.append(_SIZE.unpack_from(data, offset)[0])
+        offset += _SIZE.size
+    offset += _get_padding(offset)
+
+    view = memoryview(data)
+    stream = view[offset:offset + stream_size]
+    offset += stream_size + _get_padding(stream_size)
+
+    buffers = []
+    for size in buffer_sizes:
+        buffers.append(view[offset:offset + size])
+        offset += size + _get_padding(size)
+    return pickle.loads(stream, buffers=buffers)
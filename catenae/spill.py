@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+from threading import Lock
+
+
+class SpillBuffer:
+    """
+    FIFO append log of byte records on disk. Records are written to memory-mapped
+    segment files of segment_size bytes, which are deleted once all their records
+    have been popped. Records are marked as consumed in place, so the pending ones
+    are recovered if the process restarts with the same path.
+    """
+
+    SEGMENT_SIZE = 67108864
+    SEGMENT_SUFFIX = '.segment'
+
+    # Record length and consumed flag. A zero length marks the end of a segment
+    HEADER = struct.Struct('<IB')
+
+    def __init__(self, path, segment_size=None):
+        self.path = path
+        if segment_size is None:
+            segment_size = SpillBuffer.SEGMENT_SIZE
+        self.segment_size = segment_size
+        os.makedirs(path, exist_ok=True)
+
+        self._segments = dict()
+        self._length = 0
+        self._bytes = 0
+        self._spilled = 0
+        self._drained = 0
+        self._lock = Lock()
+
+        indexes = sorted(
+            int(filename[:-len(SpillBuffer.SEGMENT_SUFFIX)]) for filename in os.listdir(path)
+            if filename.endswith(SpillBuffer.SEGMENT_SUFFIX))
+        if not indexes:
+            indexes = [0]
+        self._read_index, self._read_offset = indexes[0], 0
+        self._write_index, self._write_offset = indexes[-1], 0
+        self._recover(indexes)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'records': self._length,
+                'bytes': self._bytes,
+                'spilled': self._spilled,
+                'drained': self._drained
+            }
+
+    def _get_segment_path(self, index):
+        return os.path.join(self.path, f'{index:020d}{SpillBuffer.SEGMENT_SUFFIX}')
+
+    def _open_segment(self, index, size=None):
+        if index in self._segments:
+            return self._segments[index]
+        path = self._get_segment_path(index)
+        with open(path, 'a+b') as segment_file:
+            if size is not None and os.path.getsize(path) < size:
+                segment_file.truncate(size)
+            segment = mmap.mmap(segment_file.fileno(), 0)
+        self._segments[index] = segment
+        return segment
+
+    def _close_segment(self, index, delete=False):
+        segment = self._segments.pop(index, None)
+        if segment is not None:
+            segment.close()
+        if delete:
+            os.remove(self._get_segment_path(index))
+
+    def _iter_records(self, segment, offset=0):
+        while offset + SpillBuffer.HEADER.size <= len(segment):
+            length, consumed = SpillBuffer.HEADER.unpack_from(segment, offset)
+            if not length:
+                return
+            yield offset, length, consumed
+            offset += SpillBuffer.HEADER.size + length
+
+    def _recover(self, indexes):
+        read_position = None
+        for index in indexes:
+            segment = self._open_segment(index, self.segment_size)
+            offset = 0
+            pending = False
+            for offset, length, consumed in self._iter_records(segment):
+                if not consumed:
+                    if read_position is None:
+                        read_position = (index, offset)
+                    pending = True
+                    self._length += 1
+                    self._bytes += length
+                offset += SpillBuffer.HEADER.size + length
+
+            if index == self._write_index:
+                self._write_offset = offset
+            elif not pending:
+                self._close_segment(index, delete=True)
+
+        if read_position is None:
+            read_position = (self._write_index, self._write_offset)
+        self._read_index, self._read_offset = read_position
+        for index in list(self._segments):
+            if index not in (self._read_index, self._write_index):
+                self._close_segment(index)
+
+    def append(self, record):
+        size = SpillBuffer.HEADER.size + len(record)
+        with self._lock:
+            segment = self._open_segment(self._write_index, self.segment_size)
+            if self._write_offset + size > len(segment):
+                if self._write_index != self._read_index:
+                    self._close_segment(self._write_index)
+                self._write_index += 1
+                self._write_offset = 0
+                segment = self._open_segment(self._write_index, max(self.segment_size, size))
+
+            offset = self._write_offset
+            segment[offset + SpillBuffer.HEADER.size:offset + size] = record
+            SpillBuffer.HEADER.pack_into(segment, offset, len(record), 0)
+            self._write_offset += size
+            self._length += 1
+            self._bytes += len(record)
+            self._spilled += 1
+
+    def _next_record(self):
+        while self._length:
+            segment = self._open_segment(self._read_index)
+            for offset, length, consumed in self._iter_records(segment, self._read_offset):
+                if not consumed:
+                    return segment, offset, length
+            # The segment has been fully read
+            self._close_segment(self._read_index, delete=True)
+            self._read_index += 1
+            self._read_offset = 0
+        return None
+
+    def peek(self):
+        """ The oldest record or None if the buffer is empty. """
+        with self._lock:
+            next_record = self._next_record()
+            if next_record is None:
+                return None
+            segment, offset, length = next_record
+            start = offset + SpillBuffer.HEADER.size
+            return segment[start:start + length]
+
+    def pop(self):
+        """ Mark the oldest record as consumed. """
+        with self._lock:
+            next_record = self._next_record()
+            if next_record is None:
+                return
+            segment, offset, length = next_record
+            SpillBuffer.HEADER.pack_into(segment, offset, length, 1)
+            self._read_offset = offset + SpillBuffer.HEADER.size + length
+            self._length -= 1
+            self._bytes -= length
+            self._drained += 1
+
+    def close(self):
+        with self._lock:
+            for index in list(self._segments):
+                self._segments[index].flush()
+                self._close_segment(index)
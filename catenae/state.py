@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+from threading import Lock
+from . import utils
+
+
+class StateStore:
+    """
+    Keyed state with a bounded in-memory LRU front over RocksDB. Writes are kept
+    as dirty entries until flush(), which persists them with a single WriteBatch.
+    """
+
+    INT_KEY_SIZE = 20
+
+    _DELETED = object()
+
+    def __init__(self, rocksdb, namespace='state', max_items=10000, ttl=None):
+        self._rocksdb = rocksdb
+        self._namespace = namespace
+        self._max_items = max_items
+        self._ttl = ttl
+        self._cache = OrderedDict()
+        self._dirty = dict()
+        self._lock = Lock()
+
+    @property
+    def namespace(self):
+        return self._namespace
+
+    @property
+    def dirty_keys(self):
+        with self._lock:
+            return len(self._dirty)
+
+    @staticmethod
+    def _get_key_bytes(store_key):
+        # Store keys are always str; write batches take the bytes easyrocks writes for them
+        from easyrocks.utils import str_to_bytes
+
+        return str_to_bytes(store_key)
+
+    def _get_store_key(self, key):
+        # All the entries share the namespace prefix so they are contiguous
+        # on disk; integers are padded to preserve their order
+        if isinstance(key, int):
+            key = str(key).zfill(StateStore.INT_KEY_SIZE)
+        elif not isinstance(key, str):
+            raise TypeError
+        return f'{self._namespace}:{key}'
+
+    def _get_expiration(self, ttl):
+        if ttl is None:
+            ttl = self._ttl
+        if ttl is None:
+            return None
+        return utils.get_timestamp() + ttl
+
+    @staticmethod
+    def _is_expired(entry):
+        expiration = entry[0]
+        return expiration is not None and expiration <= utils.get_timestamp()
+
+    def _cache_entry(self, store_key, entry):
+        self._cache[store_key] = entry
+        self._cache.move_to_end(store_key)
+        # Evicted entries which are still dirty remain in _dirty until flushed
+        while len(self._cache) > self._max_items:
+            self._cache.popitem(last=False)
+
+    def _get_entry(self, store_key):
+        if store_key in self._dirty:
+            entry = self._dirty[store_key]
+            if entry is StateStore._DELETED:
+                return None
+        elif store_key in self._cache:
+            entry = self._cache[store_key]
+            self._cache.move_to_end(store_key)
+        else:
+            entry = self._rocksdb.get(store_key)
+            if entry is None:
+                return None
+            self._cache_entry(store_key, entry)
+
+        if StateStore._is_expired(entry):
+            self._cache.pop(store_key, None)
+            self._dirty[store_key] = StateStore._DELETED
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        store_key = self._get_store_key(key)
+        with self._lock:
+            entry = self._get_entry(store_key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def exists(self, key):
+        store_key = self._get_store_key(key)
+        with self._lock:
+            return self._get_entry(store_key) is not None
+
+    def put(self, key, value, ttl=None):
+        if value is None:
+            raise ValueError
+        store_key = self._get_store_key(key)
+        entry = (self._get_expiration(ttl), value)
+        with self._lock:
+            self._dirty[store_key] = entry
+            self._cache_entry(store_key, entry)
+
+    def delete(self, key):
+        store_key = self._get_store_key(key)
+        with self._lock:
+            self._cache.pop(store_key, None)
+            self._dirty[store_key] = StateStore._DELETED
+
+    def flush(self):
+        from easyrocks import WriteBatch
+
+        with self._lock:
+            if not self._dirty:
+                return
+
+            write_batch = WriteBatch()
+            for store_key, entry in self._dirty.items():
+                if entry is StateStore._DELETED:
+                    write_batch.delete(StateStore._get_key_bytes(store_key))
+                else:
+                    self._rocksdb.put(store_key, entry, write_batch=write_batch)
+            self._rocksdb.commit(write_batch)
+            self._dirty = dict()
+
+    def purge_expired(self):
+        now = utils.get_timestamp()
+        with self._lock:
+            for store_key, entry in self._rocksdb.scan(prefix=f'{self._namespace}:'):
+                if store_key in self._dirty:
+                    continue
+                if entry[0] is not None and entry[0] <= now:
+                    self._cache.pop(store_key, None)
+                    self._dirty[store_key] = StateStore._DELETED
+        self.flush()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from threading import Lock
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """
+    Refilled with rate tokens per second, it holds up to burst tokens. Tokens are
+    taken right away; when there are not enough, the bucket goes into debt and
+    the caller waits until it is paid, so waiting callers are served in order.
+    """
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('the rate must be positive')
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._time = time.monotonic()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._time) * self.rate)
+        self._time = now
+
+    def update(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('the rate must be positive')
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = min(self._tokens, self.burst)
+
+    def reserve(self, tokens=1, now=None):
+        """ Seconds to wait before the tokens can be used. """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        self._tokens -= tokens
+        if self._tokens >= 0:
+            return 0.
+        return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets for the produced messages: one for the link, one per topic and
+    one for every key (only the MAX_KEYS most recent ones are kept). A message
+    waits until it gets a token of every bucket which applies to it.
+
+    Limits are given as messages per second or as (rate, burst) tuples.
+    """
+
+    MAX_KEYS = 10000
+
+    def __init__(self, rate=None, topic_rates=None, key_rate=None):
+        self._lock = Lock()
+        self._bucket = None
+        self._topic_buckets = dict()
+        self._key_limit = None
+        self._key_buckets = OrderedDict()
+        self._throttled_time = 0.
+        self._throttled_messages = 0
+
+        self.set_limit(rate)
+        if topic_rates:
+            for topic, topic_rate in topic_rates.items():
+                self.set_limit(topic_rate, topic=topic)
+        self.set_limit(key_rate, per_key=True)
+
+    @staticmethod
+    def _get_rate_and_burst(limit, burst=None):
+        if isinstance(limit, (list, tuple)):
+            return tuple(limit)
+        if burst is None:
+            burst = 1
+        return limit, burst
+
+    @property
+    def enabled(self):
+        return self._bucket is not None or bool(self._topic_buckets) \
+            or self._key_limit is not None
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': None if self._bucket is None else (self._bucket.rate, self._bucket.burst),
+                'topic_rates': {
+                    topic: (bucket.rate, bucket.burst)
+                    for topic, bucket in self._topic_buckets.items()
+                },
+                'key_rate': self._key_limit,
+                'throttled_time': self._throttled_time,
+                'throttled_messages': self._throttled_messages
+            }
+
+    def set_limit(self, rate, burst=None, topic=None, per_key=False):
+        """ The limit is removed if rate is None. """
+        with self._lock:
+            if rate is None:
+                if per_key:
+                    self._key_limit = None
+                    self._key_buckets.clear()
+                elif topic is not None:
+                    self._topic_buckets.pop(topic, None)
+                else:
+                    self._bucket = None
+                return
+
+            rate, burst = RateLimiter._get_rate_and_burst(rate, burst)
+            if per_key:
+                self._key_limit = (rate, burst)
+                for bucket in self._key_buckets.values():
+                    bucket.update(rate, burst)
+            elif topic is not None:
+                if topic in self._topic_buckets:
+                    self._topic_buckets[topic].update(rate, burst)
+                else:
+                    self._topic_buckets[topic] = TokenBucket(rate, burst)
+            elif self._bucket is not None:
+                self._bucket.update(rate, burst)
+            else:
+                self._bucket = TokenBucket(rate, burst)
+
+    def _get_key_bucket(self, key):
+        bucket = self._key_buckets.pop(key, None)
+        if bucket is None:
+            bucket = TokenBucket(*self._key_limit)
+        self._key_buckets[key] = bucket
+        if len(self._key_buckets) > RateLimiter.MAX_KEYS:
+            self._key_buckets.popitem(last=False)
+        return bucket
+
+    def acquire(self, topic, key=None):
+        """ Seconds to wait before producing a message, see record_throttle(). """
+        with self._lock:
+            buckets = [self._bucket, self._topic_buckets.get(topic)]
+            if key is not None and self._key_limit is not None:
+                buckets.append(self._get_key_bucket(key))
+
+            now = time.monotonic()
+            return max([bucket.reserve(now=now) for bucket in buckets if bucket is not None],
+                       default=0.)
+
+    def record_throttle(self, waited):
+        """ Time actually waited by a throttled message, which may be cut short. """
+        with self._lock:
+            self._throttled_time += waited
+            self._throttled_messages += 1
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import signal
+import time
+from collections import defaultdict
+from pickle5 import pickle
+from . import serialization
+from .electron import Electron
+from .channels import Inbox, Channels, ChannelConsumer, ChannelProducer, get_context
+
+
+def _run_link(link_class, kwargs, channels):
+    link = link_class(**kwargs)
+    link._channels = channels
+    link.start()
+
+
+class Topology:
+    """
+    Links run as local processes and connected by shared-memory channels instead
+    of Kafka. Every link gets all the messages of its input topics, distributed
+    among its instances by key (or round-robin), as a consumer group would.
+
+        topology = Topology()
+        topology.add(Streamer, output_topics=['lines'])
+        topology.add(Mapper, input_topics=['lines'], output_topics=['words'], instances=4)
+        topology.add(Reducer, input_topics=['words'])
+        topology.run()
+
+    Messages are kept in memory only, they are lost if the topology stops. RPC
+    calls and the zstd dictionaries need Kafka.
+    """
+
+    # Per input topic and link instance
+    DEFAULT_CHANNEL_CAPACITY = 16777216  # 16 MiB
+    STOP_TIMEOUT = 10
+    WAIT_INTERVAL = 0.5
+
+    def __init__(self, channel_capacity=DEFAULT_CHANNEL_CAPACITY):
+        self._channel_capacity = channel_capacity
+        self._links = []
+        self._output_topics = []
+        self._processes = []
+        self._producer = None
+        self._consumer = None
+
+    def add(self, link_class, input_topics=None, output_topics=None, instances=1, name=None,
+            **kwargs):
+        """ Other keyword arguments are passed to the constructor of the link. """
+        if self._processes:
+            raise RuntimeError('the topology is already running')
+        if name is None:
+            name = link_class.__name__.lower()
+        if name in [link['name'] for link in self._links]:
+            raise ValueError(f'duplicated link name: {name}')
+
+        kwargs['input_topics'] = list(input_topics or [])
+        kwargs['output_topics'] = list(output_topics or [])
+        self._links.append({
+            'name': name,
+            'class': link_class,
+            'kwargs': kwargs,
+            'instances': instances
+        })
+
+    def subscribe(self, topic):
+        """ The messages of the topic can be read with poll() from this process. """
+        if self._processes:
+            raise RuntimeError('the topology is already running')
+        self._output_topics.append(topic)
+
+    @property
+    def processes(self):
+        return list(self._processes)
+
+    def start(self):
+        routes = defaultdict(list)
+        inboxes = dict()
+        for link in self._links:
+            input_topics = link['kwargs']['input_topics']
+            if input_topics:
+                inboxes[link['name']] = [
+                    Inbox(input_topics, self._channel_capacity) for _ in range(link['instances'])
+                ]
+            else:
+                inboxes[link['name']] = [None] * link['instances']
+            for topic in input_topics:
+                routes[topic].append(inboxes[link['name']])
+
+        if self._output_topics:
+            output_inbox = Inbox(self._output_topics, self._channel_capacity)
+            for topic in self._output_topics:
+                routes[topic].append([output_inbox])
+            self._consumer = ChannelConsumer(output_inbox)
+            self._consumer.subscribe(self._output_topics)
+        routes = dict(routes)
+        self._producer = ChannelProducer(routes)
+
+        context = get_context()
+        for link in self._links:
+            for index, inbox in enumerate(inboxes[link['name']]):
+                process = context.Process(
+                    target=_run_link,
+                    args=(link['class'], dict(link['kwargs']), Channels(inbox, routes, index)),
+                    name=f'{link["name"]}-{index}')
+                self._processes.append(process)
+                process.start()
+
+    def run(self):
+        """ Start and wait until every link stops or an interruption. """
+        self.start()
+        try:
+            while any(process.is_alive() for process in self._processes):
+                time.sleep(Topology.WAIT_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        # Links stop gracefully on SIGTERM
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            process.join(Topology.STOP_TIMEOUT)
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+
+    def send(self, value, topic, key=None):
+        """ Produce to a topic of the topology from this process. """
+        if isinstance(value, str):
+            data = value
+        else:
+            data = serialization.dumps(Electron(key=key, value=value).get_sendable())
+        if key is not None and not isinstance(key, str):
+            key = pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+        self._producer.produce(topic=topic, key=key, value=data)
+
+    def poll(self, timeout=None):
+        """ The next electron of the subscribed topics, None on timeout. """
+        message = self._consumer.poll(timeout)
+        if message is None:
+            return None
+
+        try:
+            electron = Electron(value=message.value().decode('utf-8'))
+        except Exception:
+            electron = serialization.loads(message.value())
+        electron.timestamp = message.timestamp()[1]
+        electron.previous_topic = message.topic()
+        electron.topic = None
+        return electron
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
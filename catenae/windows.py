@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import heapq
+from threading import Lock
+from . import utils
+
+
+class Aggregate:
+    """ Incremental aggregate: accumulators are created, updated and merged. """
+    def create(self):
+        return None
+
+    def add(self, accumulator, value):
+        raise NotImplementedError
+
+    def merge(self, accumulator, other):
+        raise NotImplementedError
+
+    def result(self, accumulator):
+        return accumulator
+
+
+class Combiner(Aggregate):
+    """ Aggregate from an associative function of two values. """
+    def __init__(self, function, initial=None):
+        self.function = function
+        self.initial = initial
+
+    def create(self):
+        return self.initial
+
+    def add(self, accumulator, value):
+        if accumulator is None:
+            return value
+        return self.function(accumulator, value)
+
+    def merge(self, accumulator, other):
+        if accumulator is None:
+            return other
+        if other is None:
+            return accumulator
+        return self.function(accumulator, other)
+
+
+class Sum(Combiner):
+    def __init__(self):
+        super().__init__(lambda a, b: a + b, 0)
+
+
+class Min(Combiner):
+    def __init__(self):
+        super().__init__(min)
+
+
+class Max(Combiner):
+    def __init__(self):
+        super().__init__(max)
+
+
+class Count(Aggregate):
+    def create(self):
+        return 0
+
+    def add(self, accumulator, _):
+        return accumulator + 1
+
+    def merge(self, accumulator, other):
+        return accumulator + other
+
+
+class TumblingWindow:
+    """ Fixed-size, non-overlapping windows. Sizes are given in seconds. """
+
+    merging = False
+
+    def __init__(self, size):
+        self.size = int(size * 1000)
+
+    def assign(self, timestamp):
+        start = timestamp - timestamp % self.size
+        return [(start, start + self.size)]
+
+
+class SlidingWindow:
+    """ Fixed-size windows starting every slide seconds. """
+
+    merging = False
+
+    def __init__(self, size, slide):
+        self.size = int(size * 1000)
+        self.slide = int(slide * 1000)
+
+    def assign(self, timestamp):
+        windows = []
+        start = timestamp - timestamp % self.slide
+        while start > timestamp - self.size:
+            windows.append((start, start + self.size))
+            start -= self.slide
+        return windows
+
+
+class SessionWindow:
+    """ Per-key windows closed after gap seconds of inactivity. """
+
+    merging = True
+
+    def __init__(self, gap):
+        self.gap = int(gap * 1000)
+
+    def assign(self, timestamp):
+        return [(timestamp, timestamp + self.gap)]
+
+
+class WindowedAggregation:
+    """
+    Keyed window operator driven by event timestamps (ms). The watermark is the
+    minimum of the latest timestamps seen on every source (e.g., topic partition).
+    A window is closed when the watermark passes its end plus the allowed lateness;
+    records for already closed windows are dropped. Closed windows are returned in
+    batches as (key, start, end, result) tuples.
+
+    If sources are given, the watermark does not advance until all of them have been
+    seen. With an idle_timeout, sources without records for that long are ignored and,
+    once every source is idle, the watermark follows the clock minus the timeout, so
+    advance() closes the last windows of quiet streams (see Link.windowed()).
+    """
+    def __init__(self,
+                 window,
+                 aggregate,
+                 allowed_lateness=0,
+                 max_open_windows=None,
+                 idle_timeout=None,
+                 sources=None):
+        self.window = window
+        self.aggregate = aggregate
+        self.allowed_lateness = int(allowed_lateness * 1000)
+        self.max_open_windows = max_open_windows
+        self.idle_timeout = None if idle_timeout is None else int(idle_timeout * 1000)
+        self.sources = list(sources or [])
+
+        self._windows = dict()
+        self._ends = []
+        self._open_windows = 0
+        self._source_timestamps = dict()
+        # Time of the last record of every source, expected ones since the creation
+        now = utils.get_timestamp_ms()
+        self._source_arrivals = {source: now for source in self.sources}
+        self._watermark = None
+        self._late_records = 0
+        self._lock = Lock()
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    @property
+    def open_windows(self):
+        return self._open_windows
+
+    @property
+    def late_records(self):
+        return self._late_records
+
+    def add_electron(self, electron, key=None, value=None):
+        if key is None:
+            key = electron.key
+        if value is None:
+            value = electron.value
+        source = (electron.previous_topic, getattr(electron, 'partition', None))
+        return self.add(key, value, electron.timestamp, source=source)
+
+    def add(self, key, value, timestamp=None, source=None):
+        if timestamp is None or timestamp < 0:
+            timestamp = utils.get_timestamp_ms()
+
+        with self._lock:
+            self._advance_source(source, timestamp, utils.get_timestamp_ms())
+
+            for start, end in self.window.assign(timestamp):
+                if self._is_closed(end):
+                    self._late_records += 1
+                    continue
+                self._add_to_window(key, value, start, end)
+
+            return self._close_windows()
+
+    def advance(self, now=None):
+        """ Advance the watermark without new records (idle sources). """
+        if now is None:
+            now = utils.get_timestamp_ms()
+        with self._lock:
+            self._advance_watermark(now)
+            return self._close_windows()
+
+    def flush(self):
+        """ Close all the open windows regardless of the watermark. """
+        with self._lock:
+            return self._close_windows(force=True)
+
+    def _advance_source(self, source, timestamp, now):
+        if timestamp > self._source_timestamps.get(source, -1):
+            self._source_timestamps[source] = timestamp
+        self._source_arrivals[source] = now
+        self._advance_watermark(now)
+
+    def _is_idle(self, source, now):
+        return self.idle_timeout is not None \
+            and now - self._source_arrivals[source] >= self.idle_timeout
+
+    def _advance_watermark(self, now):
+        if any(source not in self._source_timestamps and not self._is_idle(source, now)
+               for source in self.sources):
+            return
+
+        active = [
+            timestamp for source, timestamp in self._source_timestamps.items()
+            if not self._is_idle(source, now)
+        ]
+        if active:
+            watermark = min(active)
+        elif self._source_arrivals and self.idle_timeout is not None:
+            watermark = now - self.idle_timeout
+        else:
+            return
+
+        if self._watermark is None or watermark > self._watermark:
+            self._watermark = watermark
+
+    def _is_closed(self, end):
+        return self._watermark is not None \
+            and end + self.allowed_lateness <= self._watermark
+
+    def _add_to_window(self, key, value, start, end):
+        key_windows = self._windows.setdefault(key, dict())
+
+        if self.window.merging:
+            accumulator = self.aggregate.create()
+            for other in [w for w in key_windows if w[0] <= end and start <= w[1]]:
+                accumulator = self.aggregate.merge(accumulator, key_windows.pop(other))
+                self._open_windows -= 1
+                start = min(start, other[0])
+                end = max(end, other[1])
+        elif (start, end) in key_windows:
+            accumulator = key_windows[(start, end)]
+        else:
+            accumulator = self.aggregate.create()
+
+        if (start, end) not in key_windows:
+            self._open_windows += 1
+            heapq.heappush(self._ends, (end, start, id(key), key))
+        key_windows[(start, end)] = self.aggregate.add(accumulator, value)
+
+    def _close_windows(self, force=False):
+        results = []
+        while self._ends:
+            end, start, _, key = self._ends[0]
+            over_limit = self.max_open_windows is not None \
+                and self._open_windows > self.max_open_windows
+            if not (force or over_limit or self._is_closed(end)):
+                break
+            heapq.heappop(self._ends)
+
+            # Stale entry of a merged session
+            key_windows = self._windows.get(key)
+            if key_windows is None or (start, end) not in key_windows:
+                continue
+
+            accumulator = key_windows.pop((start, end))
+            if not key_windows:
+                del self._windows[key]
+            self._open_windows -= 1
+            results.append((key, start, end, self.aggregate.result(accumulator)))
+        return results
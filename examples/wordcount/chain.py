@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Chain
+from mapper import Mapper
+from reducer import Reducer
+
+# The mapper and the reducer in a single process, without the reducer_input topic
+#   chain.py -i mapper_input -k kafka:9092
+
+if __name__ == "__main__":
+    Chain([Mapper, Reducer]).start()
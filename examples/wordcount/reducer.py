@@ -2,29 +2,30 @@
 # -*- coding: utf-8 -*-
 
 from catenae import Link, Electron
+from catenae.windows import TumblingWindow, Sum
 
 
 class Reducer(Link):
     def setup(self):
-        self.counts = dict()
-
-    def print_result(self):
-        self.logger.log('=== Updated result ===')
-        for kv in self.counts.items():
-            self.logger.log(kv)
+        # The last windows are closed after 5 seconds without words
+        self.counts = self.windowed(TumblingWindow(10),
+                                    Sum(),
+                                    on_close=self.print_result,
+                                    allowed_lateness=2,
+                                    idle_timeout=5)
+
+    def print_result(self, results):
+        self.logger.log('=== Closed windows ===')
+        for word, start, end, count in results:
+            self.logger.log(f'[{start}, {end}) {word}: {count}')
         self.logger.log()
 
-    def reduce(self, wordcount):
-        word, count = wordcount
-        if not word in self.counts:
-            self.counts[word] = count
-        else:
-            self.counts[word] += count
-
     def transform(self, electron):
-        self.reduce(electron.value)
-        self.print_result()
+        word, count = electron.value
+        results = self.counts.add_electron(electron, key=word, value=count)
+        if results:
+            self.print_result(results)
 
 
 if __name__ == "__main__":
-    Reducer().start()
\ No newline at end of file
+    Reducer().start()
@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Topology
+from streamer import Streamer
+from mapper import Mapper
+from reducer import Reducer
+
+# The whole example in a single node, without Kafka
+
+if __name__ == "__main__":
+    topology = Topology()
+    topology.add(Streamer, output_topics=['mapper_input'])
+    topology.add(Mapper, input_topics=['mapper_input'], output_topics=['reducer_input'], instances=2)
+    topology.add(Reducer, input_topics=['reducer_input'])
+    topology.run()
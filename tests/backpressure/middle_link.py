@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+import time
+
+
+class MiddleLink(Link):
+    def transform(self, electron):
+        time.sleep(0.01)
+        in_flight = self._in_flight.stats
+        assert in_flight['messages'] <= 2 * self._max_in_flight_messages
+        self.logger.log(f'Received: {electron.value}, in flight: {in_flight}')
+
+
+if __name__ == "__main__":
+    MiddleLink().start()
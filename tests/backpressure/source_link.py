@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class SourceLink(Link):
+    def setup(self):
+        self.message_count = 0
+
+    def generator(self):
+        # Much faster than the middle link
+        self.send(self.message_count)
+        self.message_count += 1
+
+
+if __name__ == "__main__":
+    SourceLink().start()
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 from catenae import Link, Electron
-import time
 
 
 class SourceLink(Link):
@@ -10,10 +9,10 @@ class SourceLink(Link):
         self.counter = 0
 
     def generator(self):
+        # Waits here while over the rate limit, 20 messages per second
         self.send(self.counter)
         self.counter += 1
-        time.sleep(.05)
 
 
 if __name__ == "__main__":
-    SourceLink().start()
+    SourceLink(rate_limit=20).start()
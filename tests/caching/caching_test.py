@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae.caching import CachedConnector
+
+
+class MongodbConnector:
+    """ Signatures of easymongo, documents in memory. """
+    def __init__(self):
+        self.documents = []
+        self.gets = 0
+
+    @staticmethod
+    def _matches(document, query):
+        return all(document.get(name) == value for name, value in (query or {}).items())
+
+    def get(self, query=None, database_name=None, collection_name=None, sort=None, limit=None):
+        self.gets += 1
+        return iter([dict(document) for document in self.documents
+                     if MongodbConnector._matches(document, query)])
+
+    def put(self, value, query=None, database_name=None, collection_name=None):
+        if query is None:
+            self.documents.append(dict(value))
+            return
+        self.documents = [document for document in self.documents
+                          if not MongodbConnector._matches(document, query)]
+        self.documents.append(dict(value))
+
+
+class AerospikeConnector:
+    """ Signatures of easyaerospike, records in memory. """
+    def __init__(self):
+        self.records = dict()
+        self.gets = 0
+
+    def get(self, key, namespace=None, set_name=None):
+        self.gets += 1
+        if key not in self.records:
+            return None, None
+        bins = self.records[key]
+        if bins == {'value': 0}:
+            return None, 0
+        if list(bins) == ['key']:
+            return bins['key'], None
+        return None, bins
+
+    def put(self, key, bins=None, namespace=None, set_name=None, store_key=False):
+        if store_key:
+            bins = {'key': key} if bins is None else dict(bins, key=key)
+        elif bins is None:
+            bins = {'value': 0}
+        self.records[key] = bins
+
+
+class RocksDB:
+    def __init__(self):
+        self.values = dict()
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self.values.get(key)
+
+    def put(self, key, value, write_batch=None):
+        self.values[key] = value
+
+
+def check_mongodb():
+    mongodb = MongodbConnector()
+    cached = CachedConnector(mongodb, write_through=True)
+    cached.put({'user': 'a', 'score': 1})
+    assert list(cached.get({'user': 'a'})) == [{'user': 'a', 'score': 1}]
+    assert list(cached.get(query={'user': 'a'})) == [{'user': 'a', 'score': 1}]
+    assert mongodb.gets == 2
+
+    # The lookups of the query are invalidated, not those keyed by the document
+    cached.put({'user': 'a', 'score': 2}, {'user': 'a'})
+    assert list(cached.get({'user': 'a'})) == [{'user': 'a', 'score': 2}]
+    assert mongodb.gets == 3
+
+    # Inserts invalidate every lookup
+    cached.put({'user': 'a', 'score': 3})
+    assert len(list(cached.get({'user': 'a'}))) == 2
+
+    # Cached documents cannot be modified through the results
+    [document, _] = cached.get({'user': 'a'})
+    document['score'] = 100
+    assert [document['score'] for document in cached.get({'user': 'a'})] == [2, 3]
+
+
+def check_aerospike():
+    aerospike = AerospikeConnector()
+    cached = CachedConnector(aerospike, write_through=True)
+    assert cached.get('sample_key') == (None, None)
+
+    cached.put('sample_key')
+    assert cached.get('sample_key') == (None, 0)
+    cached.put('sample_key', store_key=True)
+    assert cached.get('sample_key') == ('sample_key', None)
+    cached.put('sample_key', bins={'bin1': 'value1'})
+    assert cached.get('sample_key', 'catenae') == (None, {'bin1': 'value1'})
+    assert cached.get('sample_key', 'catenae') == (None, {'bin1': 'value1'})
+    assert aerospike.gets == 4
+
+    _, bins = cached.get('sample_key', 'catenae')
+    bins['bin1'] = 'modified'
+    assert cached.get('sample_key', 'catenae') == (None, {'bin1': 'value1'})
+
+
+def check_write_through():
+    rocksdb = RocksDB()
+    cached = CachedConnector(rocksdb, write_through=True)
+    value = {'count': 1}
+    cached.put('key', value)
+    value['count'] = 2
+    assert cached.get('key') == {'count': 1}
+    assert rocksdb.gets == 0
+
+
+def check_custom_keys():
+    mongodb = MongodbConnector()
+    # Documents with the user as their id: inserts only invalidate its lookups
+    cached = CachedConnector(mongodb,
+                             get_key=lambda query=None, **_: query['user'],
+                             get_write=lambda value, query=None, **_: (value['user'], None))
+    cached.put({'user': 'a', 'score': 1})
+    cached.put({'user': 'b', 'score': 1})
+    cached.get({'user': 'a'})
+    cached.get({'user': 'b'})
+    cached.put({'user': 'b', 'score': 2}, {'user': 'b'})
+    cached.get({'user': 'a'})
+    assert [document['score'] for document in cached.get({'user': 'b'})] == [2]
+    assert mongodb.gets == 3
+
+
+def main():
+    check_mongodb()
+    check_aerospike()
+    check_write_through()
+    check_custom_keys()
+    print('OK')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Fake connectors, Kafka is not needed
+cd ../.. && python tests/caching/caching_test.py
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link, Chain
+
+
+class Splitter(Link):
+    def transform(self, electron):
+        for word in electron.value.split():
+            self.send(word)
+
+
+class Filter(Link):
+    def transform(self, electron):
+        if electron.value != 'line':
+            return int(electron.value)
+
+
+class Counter(Link):
+    def setup(self):
+        self.received = set()
+
+    def transform(self, electron):
+        self.received.add(electron.value)
+        if len(self.received) % 1000 == 0:
+            self.logger.log(f'Received: {len(self.received)}/10000')
+        return electron
+
+
+if __name__ == "__main__":
+    # A single process, only the numbers are produced to output1
+    Chain([Splitter, Filter, Counter]).start()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class SourceLink(Link):
+    def generator(self):
+        yield (f'line {number}' for number in range(10000))
+        self.logger.log('All the messages have been generated')
+
+
+if __name__ == "__main__":
+    SourceLink().start()
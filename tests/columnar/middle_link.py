@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class MiddleLink(Link):
+    def transform_columns(self, batch):
+        batch['ratio'] = batch['clicks'] / (batch['views'] + 1)
+        assert (batch['ratio'] >= 0).all()
+        self.logger.log(f'Batch of {len(batch)} rows, mean ratio: {batch["ratio"].mean()}')
+        return batch
+
+
+if __name__ == "__main__":
+    MiddleLink(schema=[('clicks', 'f8'), ('views', 'i8'), ('ratio', 'f8')],
+               columnar_output=True).start()
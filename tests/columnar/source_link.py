@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+from random import random
+
+
+class SourceLink(Link):
+    def generator(self):
+        yield ({
+            'clicks': random() * 100,
+            'views': int(random() * 1000),
+            'ratio': 0.
+        } for _ in range(100000))
+
+
+if __name__ == "__main__":
+    SourceLink().start()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae.buffers import BufferedMongodbConnector
+import mongomock
+
+
+class MockMongodbConnector:
+    """ Local stand-in for easymongo.MongodbConnector """
+    def __init__(self):
+        self._client = mongomock.MongoClient()
+        self._default_database = 'catenae'
+        self._default_collection = 'catenae'
+
+    @property
+    def client(self):
+        return self._client
+
+    def open_connection(self):
+        pass
+
+    def count(self, query=None):
+        return self._client.catenae.catenae.count_documents(query or {})
+
+
+class BufferedMongoTest:
+    def __init__(self):
+        self.mongodb = BufferedMongodbConnector(MockMongodbConnector(), max_documents=10)
+        self.mongodb.client.catenae.catenae.create_index('identifier', unique=True)
+
+    def check_buffered_writes(self):
+        for i in range(5):
+            self.mongodb.put({'identifier': i})
+        assert (self.mongodb.buffered_documents == 5)
+        assert (self.mongodb.count() == 0)
+
+        assert (self.mongodb.flush() == [])
+        assert (self.mongodb.buffered_documents == 0)
+        assert (self.mongodb.count() == 5)
+
+    def check_size_threshold(self):
+        for i in range(5, 15):
+            self.mongodb.insert({'identifier': i})
+        assert (self.mongodb.buffered_documents == 0)
+        assert (self.mongodb.count() == 15)
+
+    def check_updates(self):
+        self.mongodb.put({'attr': 'value'}, query={'identifier': 0})
+        self.mongodb.flush()
+        assert (self.mongodb.client.catenae.catenae.find_one({'identifier': 0})['attr'] == 'value')
+
+    def check_failed_documents(self):
+        self.mongodb.insert({'identifier': 1})
+        self.mongodb.insert({'identifier': 100})
+        failed = self.mongodb.flush()
+        assert (len(failed) == 1 and failed[0][0]['identifier'] == 1)
+        assert (self.mongodb.count() == 16)
+
+    def start(self):
+        self.check_buffered_writes()
+        self.check_size_threshold()
+        self.check_updates()
+        self.check_failed_documents()
+
+        print('PASSED')
+
+
+if __name__ == '__main__':
+    BufferedMongoTest().start()
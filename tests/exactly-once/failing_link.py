@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+import os
+
+FAILED_PATH = '/tmp/failing_link_failed'
+
+
+class FailingLink(Link):
+    def transform(self, electron):
+        number = electron.value
+        # The link stops in the middle of a transaction the first time; the container
+        # is restarted and the message must be transformed again
+        if number == 7 and not os.path.exists(FAILED_PATH):
+            open(FAILED_PATH, 'w').close()
+            raise Exception
+        self.logger.log(f'Processed: {number}')
+        return number
+
+
+if __name__ == "__main__":
+    FailingLink().start()
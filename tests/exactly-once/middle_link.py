@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+import random
+
+
+class MiddleLink(Link):
+    def transform(self, electron):
+        number = electron.value
+        # The open transaction is aborted, its messages are transformed again
+        if random.randint(0, 20) == 7:
+            raise Exception
+        self.logger.log(f'Processed: {number}')
+        return number
+
+
+if __name__ == "__main__":
+    MiddleLink().start()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class RedeliverySinkLink(Link):
+    def setup(self):
+        self.last = None
+
+    def transform(self, electron):
+        # Every number once and in order, the failed one included
+        if self.last is not None and electron.value != self.last + 1:
+            self.suicide(f'expected {self.last + 1}, received {electron.value}')
+        self.last = electron.value
+        self.logger.log(f'[OK] received: {electron.value}')
+
+
+if __name__ == "__main__":
+    RedeliverySinkLink().start()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class SinkLink(Link):
+    def setup(self):
+        self.received = set()
+        self.duplicates = 0
+
+    def transform(self, electron):
+        if electron.value in self.received:
+            self.duplicates += 1
+        self.received.add(electron.value)
+        self.logger.log(f'Received: {electron.value}, duplicates: {self.duplicates}')
+
+
+if __name__ == "__main__":
+    SinkLink().start()
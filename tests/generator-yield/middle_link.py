@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class MiddleLink(Link):
+    def setup(self):
+        self.received = set()
+
+    def transform(self, electron):
+        self.received.add(electron.value)
+        if len(self.received) % 10000 == 0 or len(self.received) == 100000:
+            self.logger.log(f'Received: {len(self.received)}/100000')
+
+
+if __name__ == "__main__":
+    MiddleLink().start()
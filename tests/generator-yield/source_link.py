@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link
+
+
+class SourceLink(Link):
+    def generator(self):
+        # Single values, lists and iterators are streamed in batches
+        yield 0
+        yield [1, 2, 3]
+        yield (number for number in range(4, 100000))
+        self.logger.log('All the messages have been generated')
+
+
+if __name__ == "__main__":
+    SourceLink().start()
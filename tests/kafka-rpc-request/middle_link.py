@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link, Electron, rpc
+
+
+class MiddleLink(Link):
+    @rpc
+    def plus_two(self, context, number=0):
+        self.logger.log(f"method plus_two invoked by {context['uid']}")
+        return number + 2
+
+
+if __name__ == "__main__":
+    MiddleLink().start()
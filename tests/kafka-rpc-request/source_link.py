@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link, Electron
+import time
+
+
+class SourceLink(Link):
+    def generator(self):
+        self.logger.log(f'Invoking plus_two()')
+        future = self.rpc_request('plus_two', kwargs={'number': 8}, to='MiddleLink')
+        assert future.result() == 10
+
+        futures = self.rpc_request_many([('plus_two', None, {'number': number})
+                                         for number in range(10)],
+                                        to='MiddleLink')
+        assert [future.result() for future in futures] == [number + 2 for number in range(10)]
+
+        first = self.rpc_request('plus_two', kwargs={'number': 1}, to='MiddleLink', idempotent=True)
+        second = self.rpc_request('plus_two', kwargs={'number': 1}, to='MiddleLink', idempotent=True)
+        assert first is second
+
+        self.logger.log('[OK] rpc_request')
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    SourceLink().start()
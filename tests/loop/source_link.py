@@ -12,6 +12,7 @@ class SourceLink(Link):
         self.loop(self.loop_target_two_three, interval=2, args=['two', 82])
         self.loop(self.loop_target_two_three, interval=4, kwargs={'name': 'three', 'value': 82})
         self.loop(self.loop_target_four, interval=8, args=['four'], kwargs={'value': 83})
+        self.loop(self.loop_target_five, interval=.25, fixed_rate=True, jitter=.05)
 
     def loop_target_one(self, name, value=None):
         self.logger.log(f'Hello from {name}')
@@ -24,6 +25,9 @@ class SourceLink(Link):
         self.logger.log(f'Hello from {name}')
         assert value == 83
 
+    def loop_target_five(self):
+        self.logger.log('Hello from five')
+
 
 if __name__ == "__main__":
     SourceLink().start()
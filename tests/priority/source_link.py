@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 from catenae import Link, Electron
-import time
 from random import randint
 
 
@@ -14,16 +13,13 @@ class SourceLink(Link):
 
     def input1_producer(self):
         self.send(randint(0, 1000), topic='input1')
-        time.sleep(1)
 
     def input2_producer(self):
         self.send(randint(0, 1000), topic='input2')
-        time.sleep(2)
 
     def input3_producer(self):
         self.send(randint(0, 1000), topic='input3')
-        time.sleep(3)
 
 
 if __name__ == "__main__":
-    SourceLink().start()
+    SourceLink(topic_rate_limits={'input1': 1, 'input2': 1 / 2, 'input3': 1 / 3}).start()
@@ -0,0 +1,3 @@
+#!/bin/bash
+# A fake RocksDB, Kafka is not needed
+cd ../.. && python tests/state-store/state_store_test.py
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pickle
+import sys
+import time
+import types
+
+
+class FakeWriteBatch:
+    """ As the one of python-rocksdb, keys and values are bytes. """
+    def __init__(self):
+        self.operations = []
+
+    def put(self, key, value):
+        assert isinstance(key, bytes)
+        self.operations.append(('put', key, value))
+
+    def delete(self, key):
+        assert isinstance(key, bytes)
+        self.operations.append(('delete', key, None))
+
+
+class FakeDB:
+    """ The easyrocks API: str keys, stored as UTF-8 bytes. """
+    def __init__(self):
+        self.data = dict()
+
+    def put(self, key, value, write_batch=None):
+        assert isinstance(key, str)
+        if write_batch is not None:
+            write_batch.put(key.encode('utf-8'), pickle.dumps(value))
+        else:
+            self.data[key.encode('utf-8')] = pickle.dumps(value)
+
+    def get(self, key):
+        assert isinstance(key, str)
+        value = self.data.get(key.encode('utf-8'))
+        if value is not None:
+            return pickle.loads(value)
+
+    def delete(self, key):
+        assert isinstance(key, str)
+        self.data.pop(key.encode('utf-8'), None)
+
+    def commit(self, write_batch):
+        for operation, key, value in write_batch.operations:
+            if operation == 'put':
+                self.data[key] = value
+            else:
+                self.data.pop(key, None)
+
+    def scan(self, prefix=None):
+        for key in sorted(self.data):
+            key_str = key.decode('utf-8')
+            if prefix is None or key_str.startswith(prefix):
+                yield key_str, pickle.loads(self.data[key])
+
+
+def install_fake_easyrocks():
+    easyrocks = types.ModuleType('easyrocks')
+    easyrocks.WriteBatch = FakeWriteBatch
+    easyrocks.utils = types.ModuleType('easyrocks.utils')
+    easyrocks.utils.str_to_bytes = lambda string: bytes(string, 'utf-8')
+    sys.modules['easyrocks'] = easyrocks
+    sys.modules['easyrocks.utils'] = easyrocks.utils
+
+
+def check_put_delete_purge():
+    from catenae.state import StateStore
+
+    rocksdb = FakeDB()
+    state = StateStore(rocksdb, namespace='test')
+    state.put('a', 1)
+    state.put(7, 'seven')
+    state.put('expiring', 2, ttl=1)
+    state.flush()
+    assert rocksdb.get('test:a')[1] == 1
+    assert rocksdb.get(f'test:{str(7).zfill(StateStore.INT_KEY_SIZE)}')[1] == 'seven'
+
+    # Deleted on disk, not only in memory
+    state.delete('a')
+    state.flush()
+    assert rocksdb.get('test:a') is None
+    assert StateStore(rocksdb, namespace='test').get('a') is None
+    assert state.dirty_keys == 0
+
+    # Expired entries are found by scan and deleted
+    time.sleep(1.1)
+    state.purge_expired()
+    assert rocksdb.get('test:expiring') is None
+    assert StateStore(rocksdb, namespace='test').get(7) == 'seven'
+    assert len(rocksdb.data) == 1
+
+
+def main():
+    install_fake_easyrocks()
+    check_put_delete_purge()
+    print('OK')
+
+
+if __name__ == "__main__":
+    main()
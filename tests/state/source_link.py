@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from catenae import Link, Electron
+import time
+from random import randint
+
+
+class SourceLink(Link):
+    def generator(self):
+        number = randint(0, 1000)
+        self.state.put('test_key', number)
+        assert self.state.get('test_key') == number
+
+        self.state.flush()
+        assert self.rocksdb.get(f'{self.state.namespace}:test_key')[1] == number
+        self.logger.log(f"[OK] state['test_key']: {number}")
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    SourceLink(rocksdb_path='/tmp/rocksdb', state_cache_size=100).start()
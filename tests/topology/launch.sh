@@ -0,0 +1,3 @@
+#!/bin/bash
+# Local processes and shared-memory channels, Kafka is not needed
+cd ../.. && python tests/topology/topology_test.py
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from catenae import Link
+from catenae.topology import Topology
+
+
+class SourceLink(Link):
+    def generator(self):
+        yield (number for number in range(10000))
+
+
+class MiddleLink(Link):
+    def transform(self, electron):
+        return electron.value * 2, self.send_pid, [electron.value]
+
+    def send_pid(self, number):
+        self.send((number, os.getpid()), topic='pids')
+
+
+class ParityLink(Link):
+    def transform(self, electron):
+        if electron.previous_topic == 'doubled':
+            return electron.value % 2
+
+
+def main():
+    topology = Topology()
+    topology.add(SourceLink, output_topics=['numbers'])
+    topology.add(MiddleLink, input_topics=['numbers'], output_topics=['doubled'], instances=3)
+    topology.add(ParityLink, input_topics=['doubled'], output_topics=['parities'])
+    topology.subscribe('doubled')
+    topology.subscribe('pids')
+    topology.subscribe('parities')
+
+    doubled = set()
+    pids = set()
+    parities = []
+    with topology:
+        while len(doubled) < 10000 or len(parities) < 10000:
+            electron = topology.poll(timeout=30)
+            assert electron is not None
+            if electron.previous_topic == 'doubled':
+                doubled.add(electron.value)
+            elif electron.previous_topic == 'pids':
+                pids.add(electron.value[1])
+            else:
+                parities.append(electron.value)
+        assert doubled == set(range(0, 20000, 2))
+        assert set(parities) == {0}
+        # Round-robin among the instances
+        assert len(pids) == 3
+
+    print('OK')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Kafka is not needed
+cd ../.. && python tests/windows/windows_test.py
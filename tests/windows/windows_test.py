@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from catenae import Link
+from catenae.windows import WindowedAggregation, TumblingWindow, Count, Sum
+
+
+def check_close_on_watermark():
+    counts = WindowedAggregation(TumblingWindow(1), Count())
+    assert counts.add('a', 1, timestamp=100) == []
+    assert counts.add('a', 1, timestamp=900) == []
+    assert counts.add('a', 1, timestamp=1500) == [('a', 0, 1000, 2)]
+    # Late record, its window is already closed
+    assert counts.add('a', 1, timestamp=200) == []
+    assert counts.late_records == 1
+    assert counts.open_windows == 1
+
+
+def check_idle_stream():
+    counts = WindowedAggregation(TumblingWindow(1), Sum(), idle_timeout=2)
+    now = int(time.time() * 1000)
+    counts.add('a', 3, timestamp=now - 5000)
+    counts.add('a', 4, timestamp=now - 5000)
+
+    # Nothing new, but the stream is not idle yet
+    assert counts.advance(now + 1000) == []
+    # Idle: the watermark follows the clock
+    [(key, _, _, result)] = counts.advance(now + 2500)
+    assert (key, result) == ('a', 7)
+    assert counts.open_windows == 0
+
+
+def check_expected_and_idle_sources():
+    counts = WindowedAggregation(TumblingWindow(1),
+                                 Count(),
+                                 idle_timeout=0.2,
+                                 sources=['p0', 'p1'])
+    counts.add('a', 1, timestamp=100, source='p0')
+    counts.add('a', 1, timestamp=200, source='p0')
+    # p1 has not been seen yet
+    assert counts.watermark is None
+
+    counts.add('a', 1, timestamp=300, source='p1')
+    assert counts.watermark == 200
+    assert counts.advance() == []
+
+    # p1 is idle: only p0 counts
+    time.sleep(0.3)
+    assert counts.add('a', 1, timestamp=5000, source='p0') == [('a', 0, 1000, 3)]
+    assert counts.watermark == 5000
+
+
+def check_link_advances_windows():
+    results = []
+    link = Link(log_level='error')
+    counts = link.windowed(TumblingWindow(1),
+                           Count(),
+                           on_close=results.extend,
+                           idle_timeout=0.2,
+                           interval=0.05)
+    counts.add('a', 1, timestamp=int(time.time() * 1000) - 5000)
+
+    start_time = time.monotonic()
+    while not results and time.monotonic() - start_time < 5:
+        time.sleep(0.05)
+    link._scheduler.stop()
+    assert [(key, result) for key, _, _, result in results] == [('a', 1)]
+
+
+def main():
+    check_close_on_watermark()
+    check_idle_stream()
+    check_expected_and_idle_sources()
+    check_link_advances_windows()
+    print('OK')
+
+
+if __name__ == "__main__":
+    main()